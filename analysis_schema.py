@@ -0,0 +1,230 @@
+"""The analysis the model is asked for, defined once.
+
+``ANALYSIS_FIELDS`` drives everything else: the shape shown in the prompt, the JSON
+Schema sent as ``response_format``, the template used to fill in missing fields,
+and the optional short-key wire format that is expanded back after parsing.
+Used by the Flask API, the async API and the Streamlit Analyze page.
+
+ATS scores, formatting, most bonus metrics and the job match figures are computed
+locally by scoring.py; the model is only asked for the subjective parts.
+"""
+import os
+from dataclasses import dataclass
+
+from compaction import compact_job_description
+from json_repair import complete, parse_json
+
+# "prompt": schema in the prompt only; "json_object": provider JSON mode;
+# "json_schema": provider structured output, so the prompt carries no schema at all.
+OUTPUT_MODE = os.getenv("ANALYSIS_OUTPUT_MODE", "json_object")
+# Streamed answers never use a provider mode: Groq's JSON mode does not support
+# streaming, and json_repair already handles the streamed text.
+STREAM_OUTPUT_MODE = "prompt"
+# Ask for one- or two-letter keys and expand them after parsing (fewer output tokens).
+COMPACT_KEYS = os.getenv("ANALYSIS_COMPACT_KEYS", "0") == "1"
+
+SYSTEM_PROMPT = "You are an expert ATS resume analyst. Return ONLY valid JSON."
+# Goes into every result cache key with llm_router.model_key(); the API and the Streamlit
+# page share both, so either one can serve an analysis the other cached.
+# Bump whenever the prompt or the fields below change so stale cached results are not served.
+PROMPT_VERSION = "5"
+
+
+@dataclass(frozen=True)
+class Field:
+    """``type`` is "string", "integer" or "number", ``[item type]`` for arrays, or a dict of Fields."""
+
+    short: str
+    type: object
+    description: str = ""
+    nullable: bool = False
+
+
+_STRINGS = ["string"]
+
+ANALYSIS_FIELDS = {
+    "resume_summary": Field("s", "string", "4-6 line professional summary"),
+    "skills": Field("k", {
+        "found_technical": Field("t", _STRINGS),
+        "found_soft": Field("f", _STRINGS),
+        "missing": Field("m", _STRINGS, "expected for the role but absent"),
+    }),
+    # match_percentage and the keyword lists are added by scoring.match_job.
+    "job_match": Field("j", {
+        "skill_gap_analysis": Field("g", "string", "brief"),
+    }, "null without a job description", nullable=True),
+    "keywords": Field("w", {
+        "density_analysis": Field("d", "string", "brief"),
+        "present": Field("p", _STRINGS),
+        "missing": Field("m", _STRINGS),
+        "suggested": Field("s", _STRINGS),
+    }),
+    "experience": Field("x", {
+        "years": Field("y", "number"),
+        "roles": Field("r", _STRINGS),
+        "career_progression": Field("c", "string", "brief"),
+    }),
+    "education": Field("e", [{
+        "degree": Field("d", "string"),
+        "university": Field("u", "string"),
+        "year": Field("y", "string"),
+        "relevance": Field("r", "string"),
+    }]),
+    "strengths": Field("st", _STRINGS),
+    "weaknesses": Field("we", _STRINGS),
+    "improvements": Field("im", _STRINGS, "actionable"),
+    "bonus_metrics": Field("b", {
+        "grammar_score": Field("g", "integer", "0-100"),
+    }),
+}
+
+
+def _key(name, field, compact):
+    return field.short if compact else name
+
+
+def _type_schema(kind, compact):
+    if isinstance(kind, dict):
+        return json_schema(kind, compact)
+    if isinstance(kind, list):
+        return {"type": "array", "items": _type_schema(kind[0], compact)}
+    return {"type": kind}
+
+
+def json_schema(fields=ANALYSIS_FIELDS, compact=COMPACT_KEYS):
+    """Strict JSON Schema for ``fields``: every key required, no extra keys."""
+    properties = {}
+    for name, field in fields.items():
+        schema = _type_schema(field.type, compact)
+        if field.description:
+            schema["description"] = f"{name}: {field.description}" if compact else field.description
+        elif compact:
+            schema["description"] = name
+        if field.nullable:
+            schema = {"anyOf": [schema, {"type": "null"}]}
+        properties[_key(name, field, compact)] = schema
+    return {"type": "object", "properties": properties, "required": list(properties), "additionalProperties": False}
+
+
+def _type_text(kind, compact, indent):
+    if isinstance(kind, dict):
+        return shape_text(kind, compact, indent)
+    if isinstance(kind, list):
+        return "[" + _type_text(kind[0], compact, indent) + "]"
+    return kind
+
+
+def shape_text(fields=ANALYSIS_FIELDS, compact=COMPACT_KEYS, indent=""):
+    """Compact, commented sketch of the expected JSON for the prompt."""
+    inner = indent + "  "
+    lines = []
+    for position, (name, field) in enumerate(fields.items(), 1):
+        value = _type_text(field.type, compact, inner)
+        if field.nullable:
+            value += " | null"
+        comma = "," if position < len(fields) else ""
+        notes = [part for part in ((name if compact else ""), field.description) if part]
+        comment = "  // " + ": ".join(notes) if notes else ""
+        lines.append(f'{inner}"{_key(name, field, compact)}": {value}{comma}{comment}')
+    return "{\n" + "\n".join(lines) + "\n" + indent + "}"
+
+
+def _template_for(kind):
+    if isinstance(kind, dict):
+        return template(kind)
+    if isinstance(kind, list):
+        return []
+    return "" if kind == "string" else 0
+
+
+def template(fields=ANALYSIS_FIELDS):
+    """Example-shaped template for json_repair.complete."""
+    return {name: _template_for(field.type) for name, field in fields.items()}
+
+
+def nullable_paths(fields=ANALYSIS_FIELDS, prefix=""):
+    """Dotted paths of fields that may be null, for json_repair.complete."""
+    paths = []
+    for name, field in fields.items():
+        if field.nullable:
+            paths.append(prefix + name)
+        if isinstance(field.type, dict):
+            paths.extend(nullable_paths(field.type, f"{prefix}{name}."))
+    return tuple(paths)
+
+
+def _expand_value(kind, value):
+    if isinstance(kind, dict) and isinstance(value, dict):
+        return expand(value, kind)
+    if isinstance(kind, list) and isinstance(value, list):
+        return [_expand_value(kind[0], item) for item in value]
+    return value
+
+
+def expand(data, fields=ANALYSIS_FIELDS):
+    """Rename short keys to full names, recursively. Full names and unknown keys pass through."""
+    by_short = {field.short: name for name, field in fields.items()}
+    result = {}
+    for key, value in data.items():
+        name = key if key in fields else by_short.get(key, key)
+        field = fields.get(name)
+        result[name] = _expand_value(field.type, value) if field else value
+    return result
+
+
+def expand_section(key, value, fields=ANALYSIS_FIELDS):
+    """Expand one streamed top-level member. Returns (full name, expanded value)."""
+    return next(iter(expand({key: value}, fields).items()))
+
+
+def parse_analysis(raw, repairer=None):
+    """Parse a model answer, expand short keys and fill in fields it lacks.
+
+    ``repairer`` is a json_repair.JSONRepairer already fed a streamed ``raw``; its
+    work is used instead of parsing ``raw`` again. Returns (data or None, repairs,
+    missing fields).
+    """
+    data, repairs = repairer.parse() if repairer is not None else parse_json(raw)
+    if not isinstance(data, dict) or not data:
+        return None, repairs, []
+    data, missing = complete(expand(data), template(), nullable_paths())
+    return data, repairs, missing
+
+
+def build_prompt_context(job_desc=None, role=None):
+    """Job description and role header; identical for every resume in a batch."""
+    role_ctx = role or "general job applications"
+    job_section = ""
+    if job_desc:
+        job_section = "JOB DESCRIPTION (for match analysis):\n" + job_desc + "\n\n"
+    return job_section + "TARGET ROLE: " + role_ctx + "\n\n"
+
+
+def build_analysis_prompt(resume_text, job_desc=None, role=None, context=None, mode=OUTPUT_MODE, compact=COMPACT_KEYS):
+    if context is None:
+        context = build_prompt_context(compact_job_description(job_desc), role)
+    prompt = "Analyze this resume and return a JSON object. Return ONLY valid JSON, no other text.\n\n"
+    prompt += context + "RESUME CONTENT:\n" + resume_text + "\n\n"
+    if mode == "json_schema":
+        return prompt + "Follow the provided response schema."
+    return prompt + "Return JSON with exactly this structure:\n\n" + shape_text(compact=compact)
+
+
+def build_messages(prompt):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
+
+
+def completion_params(mode=OUTPUT_MODE, compact=COMPACT_KEYS):
+    """Keyword arguments for chat.completions.create shared by every caller."""
+    params = {"temperature": 0.3, "max_tokens": 4000}
+    if mode == "json_object":
+        params["response_format"] = {"type": "json_object"}
+    elif mode == "json_schema":
+        params["response_format"] = {
+            "type": "json_schema",
+            "json_schema": {"name": "resume_analysis", "schema": json_schema(compact=compact), "strict": True},
+        }
+    return params
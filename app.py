@@ -1,171 +1,434 @@
 """Flask API for AI Resume Critiquer."""
 import os
+import codecs
+import hmac
 import io
 import json
-import re
-from flask import Flask, request, jsonify, render_template, send_from_directory
+import tempfile
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from flask import Flask, Request, Response, g, has_request_context, request, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
-import PyPDF2
-from openai import OpenAI
+from werkzeug.middleware.proxy_fix import ProxyFix
+from cache import get_result_cache, get_text_cache, make_cache_key, normalize_text
+from llm_client import pool_stats
+from llm_router import get_router, model_key
+from near_duplicates import context_key, get_near_duplicate_index
+from jd_store import get_jd_store, load_postings
+from compaction import compact_inputs, compact_job_description
+from scoring import job_profile, match_job, match_jobs, merge_local_scores, score_resume
+from jobs import get_job_queue
+from ratelimit import ClientLimiter, RateLimited
+from resilience import CircuitOpen, DeadlineExceeded
+from extraction import EXTRACT_WORKERS, ExtractionResult, extract_cached, get_extraction_service
+from static_pages import StaticFiles
+from streaming import SectionStreamer, sse_event
+from json_repair import JSONRepairer, parse_json
+import analysis_schema
+from analysis_schema import (
+    OUTPUT_MODE,
+    PROMPT_VERSION,
+    STREAM_OUTPUT_MODE,
+    build_analysis_prompt,
+    build_messages,
+    build_prompt_context,
+    completion_params,
+    expand_section,
+)
+import metrics
+from metrics import record_error, record_usage, stage
 
 load_dotenv()
 
-app = Flask(__name__, static_folder=None, template_folder='.')
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+BATCH_MAX_UPLOAD_BYTES = int(os.getenv("BATCH_MAX_UPLOAD_BYTES", str(200 * 1024 * 1024)))
+UPLOAD_SPOOL_BYTES = 512 * 1024
+TEXT_READ_CHUNK = 64 * 1024
+
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "500"))
+BATCH_MAX_FILE_BYTES = int(os.getenv("BATCH_MAX_FILE_BYTES", str(10 * 1024 * 1024)))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "8"))
+# /api/match/rank: descriptions per request, and how many of the best get an LLM analysis.
+MATCH_MAX_JOB_DESCRIPTIONS = int(os.getenv("MATCH_MAX_JOB_DESCRIPTIONS", "50"))
+MATCH_TOP_K = int(os.getenv("MATCH_TOP_K", "3"))
+MATCH_MAX_TOP_K = int(os.getenv("MATCH_MAX_TOP_K", "5"))
+# JSON list of popular postings (strings or {"text": ...}) to preprocess at startup; see /api/jd/top.
+JD_STORE_WARM_FILE = os.getenv("JD_STORE_WARM_FILE")
+# Bearer token for the text of pasted job descriptions (/api/jd/top?text=1); unset refuses it.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Browser cache lifetime for the HTML pages; ETags make revalidation after it cheap.
+STATIC_MAX_AGE = int(os.getenv("STATIC_MAX_AGE", "3600"))
+# Number of proxies in front of the app whose X-Forwarded-For can be trusted.
+PROXY_FIX_X_FOR = int(os.getenv("PROXY_FIX_X_FOR", "0"))
+# Per-client limit on the endpoints that spend upstream quota. 0 disables it. Off by default
+# unless PROXY_FIX_X_FOR is set: behind a proxy every visitor would otherwise share its address.
+CLIENT_RATE_PER_MINUTE = float(os.getenv("CLIENT_RATE_PER_MINUTE", "10" if PROXY_FIX_X_FOR else "0"))
+CLIENT_BURST = int(os.getenv("CLIENT_BURST", "5"))
+LIMITED_ENDPOINTS = {'analyze_resume', 'analyze_resume_stream', 'analyze_batch', 'create_job', 'match_resume',
+                     'rank_job_descriptions'}
+
+
+class UploadRequest(Request):
+    """Request that caps upload size while streaming and spools large files to a named temp file.
+
+    A named file lets extraction workers map the upload directly instead of
+    receiving a pickled copy of its bytes.
+    """
+
+    @property
+    def max_content_length(self):
+        if self.endpoint == 'analyze_batch':
+            return BATCH_MAX_UPLOAD_BYTES
+        return MAX_UPLOAD_BYTES
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if total_content_length is not None and total_content_length <= UPLOAD_SPOOL_BYTES:
+            return io.BytesIO()
+        return tempfile.NamedTemporaryFile("wb+", suffix=".upload")
+
+
+app = Flask(__name__, static_folder=None, template_folder=None)
+app.request_class = UploadRequest
+if PROXY_FIX_X_FOR:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXY_FIX_X_FOR)
 CORS(app)
+client_limiter = ClientLimiter(CLIENT_RATE_PER_MINUTE, CLIENT_BURST) if CLIENT_RATE_PER_MINUTE > 0 else None
 
 
-def get_groq_client():
-    api_key = os.getenv("GROQ_API_KEY") or os.getenv("GROK_API_KEY")
-    if not api_key:
-        return None
-    return OpenAI(api_key=api_key, base_url="https://api.groq.com/openai/v1")
+def rate_limited(e):
+    response = jsonify({"error": str(e), "retry_after": e.retry_after})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
+
+@app.before_request
+def start_timer():
+    g.started = time.perf_counter()
+
+
+@app.before_request
+def limit_clients():
+    if client_limiter and request.endpoint in LIMITED_ENDPOINTS:
+        try:
+            client_limiter.check(request.remote_addr)
+        except RateLimited as e:
+            record_error(request.endpoint, e)
+            return rate_limited(e)
+
+
+@app.after_request
+def observe_request(response):
+    # Streaming endpoints are timed to their first byte; their stages are timed separately.
+    if request.endpoint and request.endpoint.startswith(('analyze_', 'cache_', 'llm_')):
+        metrics.REQUEST_SECONDS.observe(
+            time.perf_counter() - g.started, endpoint=request.endpoint, status=response.status_code)
+    return response
+
 
+def get_llm_client():
+    """Router over the configured LLM backends (see llm_router.py), or None without an API key."""
+    return get_router()
 
-def extract_text_from_pdf(pdf_file):
-    pdf_reader = PyPDF2.PdfReader(pdf_file)
-    return "\n".join(page.extract_text() or "" for page in pdf_reader.pages)
+
+def extract_document(filename, data):
+    """Extract text from upload bytes, reusing earlier extractions of the same bytes."""
+    with stage("extract"):
+        if filename.endswith('.pdf'):
+            return extract_cached(io.BytesIO(data), "pdf", lambda: get_extraction_service().extract_pdf(data))
+        return extract_cached(io.BytesIO(data), "txt", lambda: ExtractionResult(data.decode("utf-8")))
+
+
+def decode_text_stream(stream, encoding="utf-8"):
+    """Decode a text upload chunk by chunk instead of reading it into one bytes object first."""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    parts = []
+    while chunk := stream.read(TEXT_READ_CHUNK):
+        parts.append(decoder.decode(chunk))
+    parts.append(decoder.decode(b"", final=True))
+    return "".join(parts)
+
+
+def extract_upload(file):
+    """Extract text from an upload, reusing earlier extractions of the same bytes."""
+    kind = "pdf" if file.filename.endswith('.pdf') else "txt"
+    return extract_cached(file.stream, kind, lambda: _extract_stream(file))
+
+
+def _extract_stream(file):
+    """Extract text straight from the upload's spooled stream without duplicating it in memory."""
+    stream = file.stream
+    if not file.filename.endswith('.pdf'):
+        return ExtractionResult(decode_text_stream(stream))
+    path = getattr(stream, "name", None)
+    if isinstance(path, str) and os.path.isfile(path):
+        stream.flush()
+        return get_extraction_service().extract_pdf(path)
+    if isinstance(stream, io.BytesIO):
+        return get_extraction_service().extract_pdf(stream.getvalue())
+    return get_extraction_service().extract_pdf(stream.read())
 
 
 def extract_text_from_file(file):
-    if file.filename.endswith('.pdf'):
-        return extract_text_from_pdf(io.BytesIO(file.read()))
-    return file.read().decode("utf-8")
+    return extract_upload(file).text
 
 
 def parse_ai_json(text):
-    text = text.strip()
-    # Try to find JSON in the text
+    """Parse the model's JSON answer, repairing truncation and common syntax slips."""
+    data, _ = parse_json(text)
+    return data if isinstance(data, dict) and data else None
+
+
+def parse_analysis(raw, repairer=None):
+    """analysis_schema.parse_analysis, counting the repairs it needed."""
+    data, repairs, missing = analysis_schema.parse_analysis(raw, repairer)
+    for repair in repairs:
+        metrics.JSON_REPAIRS.inc(repair=repair)
+    return data, repairs, missing
+
+
+def read_batch_uploads(files):
+    """Return [(filename, bytes)] from uploaded files; .zip uploads are expanded."""
+    items = []
+    for file in files:
+        if file.filename.endswith('.zip'):
+            with zipfile.ZipFile(file.stream) as archive:
+                for info in archive.infolist():
+                    name = info.filename
+                    if info.is_dir() or name.startswith('__MACOSX/') or not name.endswith(('.pdf', '.txt')):
+                        continue
+                    if info.file_size > BATCH_MAX_FILE_BYTES:
+                        raise ValueError(f"{name} exceeds {BATCH_MAX_FILE_BYTES} bytes")
+                    items.append((name, archive.read(info)))
+        else:
+            size = file.stream.seek(0, os.SEEK_END)
+            file.stream.seek(0)
+            if size > BATCH_MAX_FILE_BYTES:
+                raise ValueError(f"{file.filename} exceeds {BATCH_MAX_FILE_BYTES} bytes")
+            items.append((file.filename, file.read()))
+        if len(items) > BATCH_MAX_FILES:
+            raise ValueError(f"Batch is limited to {BATCH_MAX_FILES} resumes")
+    return items
+
+
+class AnalysisParseError(Exception):
+    """The model answered, but not with parseable JSON."""
+
+    def __init__(self, raw):
+        super().__init__("Could not parse structured output")
+        self.raw = raw
+
+
+def prepare_analysis(file_content, job_desc=None, role=None, context=None, mode=OUTPUT_MODE):
+    """Compact the prompt inputs. Returns (prompt, cache_key, token_stats).
+    
+    The cache key is taken over the compacted text, so submissions that differ only
+    in extraction noise or job-posting boilerplate share a cached result. ``mode``
+    only changes how the prompt asks for the structure, so it is not part of the key.
+    """
+    compacted = compact_inputs(file_content, job_desc)
+    cache_key = make_cache_key(compacted.resume, compacted.job_desc, role, model_key(), PROMPT_VERSION)
+    if context is None:
+        context = build_prompt_context(compacted.job_desc, role)
+    prompt = build_analysis_prompt(compacted.resume, context=context, mode=mode)
+    return prompt, cache_key, compacted.stats
+
+
+def near_duplicate_key(file_content, job_desc=None, role=None):
+    """(context, sketch) under which this resume is matched against earlier ones."""
+    return (context_key(file_content, job_desc, role, model_key(), PROMPT_VERSION),
+            get_near_duplicate_index().sketch(file_content))
+
+
+def reuse_near_duplicate(near_key, local, token_stats):
+    """Cached analysis of an almost identical resume, rescored locally. Returns (data, meta) or None.
+    
+    The model's sections come from the earlier resume; the local scores are recomputed
+    for this one, so an edit that moves the ATS score still shows.
+    """
+    found = get_near_duplicate_index().find(*near_key, get_result_cache().peek)
+    if found is None:
+        return None
+    prior, score = found
+    return merge_local_scores(prior, local), {"cache": "near", "reused": {"similarity": round(score, 3)},
+                                              "tokens": token_stats}
+
+
+def file_type_of(filename):
+    return "PDF" if filename.endswith('.pdf') else "TXT"
+
+
+def degraded_meta(error, token_stats):
+    return {"mode": "local", "cache": "miss", "degraded": str(error), "retry_after": error.retry_after,
+            "tokens": token_stats}
+
+
+def run_analysis(client, file_content, job_desc=None, role=None, context=None, local=None, degrade=True):
+    """Analyze extracted resume text, going through the result cache. Returns (data, meta).
+    
+    ``local`` holds the scores from scoring.score_resume; they are merged over the
+    model's subjective sections. While the LLM circuit is open, the local scores are
+    returned on their own (``degrade``) instead of raising CircuitOpen.
+    """
+    if local is None:
+        with stage("score"):
+            local = score_resume(file_content, job_desc, role)
+    with stage("prompt"):
+        prompt, cache_key, token_stats = prepare_analysis(file_content, job_desc, role, context)
+    cache = get_result_cache()
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached, {"cache": "hit", "tokens": token_stats}
+    with stage("near_duplicate"):
+        near_key = near_duplicate_key(file_content, job_desc, role)
+        reused = reuse_near_duplicate(near_key, local, token_stats)
+    if reused is not None:
+        return reused
+    
     try:
-        return json.loads(text)
-    except:
-        pass
-    # Try finding JSON in code blocks
-    match = re.search(r'\{[\s\S]*\}', text)
-    if match:
-        try:
-            return json.loads(match.group())
-        except:
-            pass
-    return None
-
-
-def build_analysis_prompt(resume_text, job_desc=None, role=None):
-    role_ctx = role or "general job applications"
-    job_section = ""
-    if job_desc:
-        job_section = "JOB DESCRIPTION (for match analysis):\n" + job_desc + "\n\n"
-    
-    prompt = """Analyze this resume and return a JSON object with the following structure. Return ONLY valid JSON, no other text.
-
-""" + job_section + """TARGET ROLE: """ + role_ctx + """
-
-RESUME CONTENT:
-""" + resume_text + """
-
-Return this exact JSON structure:
-
-{
-  "ats_score": 85,
-  "ats_status": "Pass",
-  "ats_breakdown": {
-    "keywords": 90,
-    "formatting": 80,
-    "sections": 85,
-    "readability": 85
-  },
-  "resume_summary": "Professional summary here",
-  "skills": {
-    "found_technical": ["Python", "JavaScript"],
-    "found_soft": ["Communication"],
-    "missing": ["SQL"]
-  },
-  "job_match": {
-    "match_percentage": 75,
-    "matching_keywords": ["Python"],
-    "missing_keywords": ["SQL"],
-    "skill_gap_analysis": "Some analysis"
-  },
-  "keywords": {
-    "density_analysis": "Good density",
-    "present": ["Python"],
-    "missing": ["SQL"],
-    "suggested": ["AWS"]
-  },
-  "experience": {
-    "years": 5,
-    "roles": ["Developer"],
-    "career_progression": "Good progression"
-  },
-  "education": [
-    {"degree": "BS Computer Science", "university": "University", "year": "2020", "relevance": "Relevant"}
-  ],
-  "formatting": {
-    "file_type": "PDF",
-    "tables_detected": false,
-    "headings_ok": true,
-    "graphics_issues": "None",
-    "length_pages": 2,
-    "issues": [],
-    "compliant": true
-  },
-  "strengths": ["Good format"],
-  "weaknesses": ["Missing keywords"],
-  "improvements": ["Add more keywords"],
-  "bonus_metrics": {
-    "readability_score": 80,
-    "length_score": 85,
-    "grammar_score": 90,
-    "section_completeness": 85
-  }
-}"""
-    return prompt
+        with stage("llm"):
+            response, backend = client.create(
+                build_messages(prompt),
+                **completion_params(),
+            )
+    except CircuitOpen as e:
+        if not degrade:
+            raise
+        metrics.DEGRADED.inc(endpoint=request.endpoint if has_request_context() else "background")
+        return local, degraded_meta(e, token_stats)
+    record_usage(getattr(response, "usage", None), backend)
+    
+    with stage("parse"):
+        raw = response.choices[0].message.content
+        data, repairs, missing = parse_analysis(raw)
+    if not data:
+        metrics.PARSE_FAILURES.inc()
+        raise AnalysisParseError(raw)
+    data = merge_local_scores(data, local)
+    meta = {"cache": "miss", "backend": backend, "tokens": token_stats}
+    if repairs or missing:
+        meta.update(repairs=repairs, missing_fields=missing)
+    # A cut-off answer is returned but not cached, so asking again can still get a complete one.
+    if "truncated" not in repairs:
+        cache.set(cache_key, data)
+        get_near_duplicate_index().add(*near_key, cache_key)
+    return data, meta
+
+
+# The pages contain no template variables; they are loaded and compressed once here.
+static_files = StaticFiles(os.path.dirname(os.path.abspath(__file__)), max_age=STATIC_MAX_AGE)
+for _page in ('index.html', 'analyze.html', 'about.html', 'contact.html', 'privacy.html'):
+    static_files.add(_page)
+static_files.add('ads.txt', 'text/plain; charset=utf-8')
+
+# Popular postings are compacted and profiled before the first request needs them.
+if JD_STORE_WARM_FILE:
+    get_jd_store().warm(load_postings(JD_STORE_WARM_FILE), compact_job_description, job_profile)
 
 
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return static_files.response('index.html', request)
 
 
 @app.route('/analyze')
 @app.route('/analyze.html')
 def analyze_page():
-    return render_template('analyze.html')
+    return static_files.response('analyze.html', request)
 
 
 @app.route('/about')
 @app.route('/about.html')
 def about_page():
-    return render_template('about.html')
+    return static_files.response('about.html', request)
 
 
 @app.route('/contact')
 @app.route('/contact.html')
 def contact_page():
-    return render_template('contact.html')
+    return static_files.response('contact.html', request)
 
 
 @app.route('/privacy')
 @app.route('/privacy.html')
 def privacy_page():
-    return render_template('privacy.html')
+    return static_files.response('privacy.html', request)
 
 
 @app.route('/ads.txt')
 def ads_txt():
-    return send_from_directory('.', 'ads.txt')
+    return static_files.response('ads.txt', request)
 
 
 @app.route('/index.html')
 def index_page():
-    return render_template('index.html')
+    return static_files.response('index.html', request)
 
 
 @app.route('/api/analyze', methods=['POST'])
 def analyze_resume():
-    client = get_groq_client()
+    with stage("upload"):
+        form, files = request.form, request.files
+    fast = form.get('mode') == 'fast'
+    client = None if fast else get_llm_client()
     
-    if not client:
+    if not fast and not client:
+        return jsonify({"error": "GROQ_API_KEY not configured"}), 500
+    
+    if 'file' not in files:
+        return jsonify({"error": "No file uploaded"}), 400
+    
+    file = files['file']
+    job_description = form.get('job_description', '')
+    job_role = form.get('job_role', '')
+    
+    try:
+        with stage("extract"):
+            document = extract_upload(file)
+        file_content = document.text
+        
+        if not file_content.strip():
+            return jsonify({"error": "File has no extractable content"}), 400
+        
+        job_desc = job_description if job_description.strip() else None
+        role = job_role if job_role.strip() else None
+        with stage("score"):
+            local = score_resume(file_content, job_desc, role, file_type_of(file.filename), document.pages_total)
+        if fast:
+            return jsonify(dict(local, _meta={"mode": "fast", "extraction": document.meta()}))
+        
+        data, meta = run_analysis(client, file_content, job_desc, role, local=local)
+        meta["extraction"] = document.meta()
+        with stage("serialize"):
+            return jsonify(dict(data, _meta=meta))
+    
+    except AnalysisParseError as e:
+        record_error('analyze_resume', e)
+        return jsonify({"error": str(e), "raw": e.raw}), 500
+    except RateLimited as e:
+        record_error('analyze_resume', e)
+        return rate_limited(e)
+    except DeadlineExceeded as e:
+        record_error('analyze_resume', e)
+        return jsonify({"error": str(e)}), 504
+    except Exception as e:
+        record_error('analyze_resume', e)
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/analyze/stream', methods=['POST'])
+def analyze_resume_stream():
+    """Same as /api/analyze, but sends each top-level JSON section as an SSE event.
+    
+    Locally computed scores are sent first, before the model has produced anything.
+    """
+    fast = request.form.get('mode') == 'fast'
+    client = None if fast else get_llm_client()
+    
+    if not fast and not client:
         return jsonify({"error": "GROQ_API_KEY not configured"}), 500
     
     if 'file' not in request.files:
@@ -176,37 +439,459 @@ def analyze_resume():
     job_role = request.form.get('job_role', '')
     
     try:
-        file_content = extract_text_from_file(file)
+        with stage("extract"):
+            document = extract_upload(file)
+    except Exception as e:
+        record_error('analyze_resume_stream', e)
+        return jsonify({"error": str(e)}), 500
+    file_content = document.text
+    
+    if not file_content.strip():
+        return jsonify({"error": "File has no extractable content"}), 400
+    
+    job_desc = job_description if job_description.strip() else None
+    role = job_role if job_role.strip() else None
+    with stage("score"):
+        local = score_resume(file_content, job_desc, role, file_type_of(file.filename), document.pages_total)
+    with stage("prompt"):
+        prompt, cache_key, token_stats = prepare_analysis(file_content, job_desc, role, mode=STREAM_OUTPUT_MODE)
+    cache = get_result_cache()
+    cached = None if fast else cache.get(cache_key)
+    cached_meta = {"cache": "hit", "tokens": token_stats}
+    if not fast and cached is None:
+        with stage("near_duplicate"):
+            near_key = near_duplicate_key(file_content, job_desc, role)
+            reused = reuse_near_duplicate(near_key, local, token_stats)
+        if reused is not None:
+            cached, cached_meta = reused
+    
+    def generate():
+        if fast:
+            for key, value in local.items():
+                yield sse_event("section", {"key": key, "value": value})
+            yield sse_event("done", {"_meta": {"mode": "fast", "extraction": document.meta()}})
+            return
         
-        if not file_content.strip():
-            return jsonify({"error": "File has no extractable content"}), 400
+        if cached is not None:
+            for key, value in cached.items():
+                yield sse_event("section", {"key": key, "value": value})
+            yield sse_event("done", {"_meta": dict(cached_meta, extraction=document.meta())})
+            return
         
-        prompt = build_analysis_prompt(
-            file_content,
-            job_description if job_description.strip() else None,
-            job_role if job_role.strip() else None
-        )
+        for key, value in local.items():
+            yield sse_event("section", {"key": key, "value": value})
         
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": "You are an expert ATS resume analyst. Return ONLY valid JSON."},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.3,
-            max_tokens=4000,
-        )
+        stream = None
+        sections = {}
+        try:
+            # Timed by hand: a span would have to stay open across the yields below.
+            started = time.perf_counter()
+            stream, backend = client.create(
+                build_messages(prompt),
+                stream=True,
+                **completion_params(STREAM_OUTPUT_MODE),
+            )
+            streamer = SectionStreamer()
+            # Repairs the answer as it arrives, so only json.loads is left once it ends.
+            repairer = JSONRepairer()
+            for chunk in stream:
+                record_usage(getattr(chunk, "usage", None), backend)
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content or ""
+                repairer.feed(content)
+                for key, value in streamer.feed(content):
+                    key, value = expand_section(key, value)
+                    sections[key] = value
+                    value = merge_local_scores({key: value}, local)[key]
+                    yield sse_event("section", {"key": key, "value": value})
+            metrics.STAGE_SECONDS.observe(time.perf_counter() - started, stage="llm")
+            
+            with stage("parse"):
+                data, repairs, missing = parse_analysis(streamer.text, repairer)
+            if not data:
+                metrics.PARSE_FAILURES.inc()
+                yield sse_event("error", {"error": "Could not parse structured output", "raw": streamer.text})
+                return
+            data = merge_local_scores(data, local)
+            for key, value in data.items():
+                if key not in local and sections.get(key) != value:
+                    yield sse_event("section", {"key": key, "value": value})
+            meta = {
+                "cache": "miss",
+                "backend": backend,
+                "tokens": token_stats,
+                "extraction": document.meta(),
+            }
+            if repairs or missing:
+                meta.update(repairs=repairs, missing_fields=missing)
+            if "truncated" not in repairs:
+                cache.set(cache_key, data)
+                get_near_duplicate_index().add(*near_key, cache_key)
+            yield sse_event("done", {"_meta": meta})
+        except CircuitOpen as e:
+            metrics.DEGRADED.inc(endpoint='analyze_resume_stream')
+            yield sse_event("done", {"_meta": dict(degraded_meta(e, token_stats), extraction=document.meta())})
+        except RateLimited as e:
+            record_error('analyze_resume_stream', e)
+            yield sse_event("error", {"error": str(e), "retry_after": e.retry_after})
+        except Exception as e:
+            record_error('analyze_resume_stream', e)
+            yield sse_event("error", {"error": str(e)})
+        finally:
+            if stream is not None and hasattr(stream, "close"):
+                stream.close()
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+
+@app.route('/api/match', methods=['POST'])
+def match_resume():
+    """Local resume vs job description match: keyword and requirement coverage, per-section similarity.
+    
+    Takes a ``file`` upload or ``resume_text``, plus ``job_description`` and an optional
+    ``job_role``. Never calls the LLM; the same inputs always give the same answer.
+    """
+    job_description = request.form.get('job_description', '')
+    job_role = request.form.get('job_role', '')
+    if not job_description.strip():
+        return jsonify({"error": "job_description is required"}), 400
+    
+    if 'file' in request.files:
+        try:
+            with stage("extract"):
+                text = extract_upload(request.files['file']).text
+        except Exception as e:
+            record_error('match_resume', e)
+            return jsonify({"error": str(e)}), 500
+    else:
+        text = request.form.get('resume_text', '')
+    if not text.strip():
+        return jsonify({"error": "No resume file or resume_text given"}), 400
+    
+    with stage("match"):
+        match = match_job(text, job_description, job_role.strip() or None)
+    if match is None:
+        return jsonify({"error": "Job description has no usable terms"}), 400
+    return jsonify(match)
+
+
+def read_job_descriptions(form):
+    """``job_descriptions`` as a JSON list of strings or {"id", "title", "text"} objects,
+    or repeated ``job_description`` fields. Returns a list of {"id", "title", "text"}."""
+    raw = form.get('job_descriptions')
+    items = json.loads(raw) if raw else form.getlist('job_description')
+    if not isinstance(items, list):
+        raise ValueError("job_descriptions must be a JSON list")
+    if len(items) > MATCH_MAX_JOB_DESCRIPTIONS:
+        raise ValueError(f"At most {MATCH_MAX_JOB_DESCRIPTIONS} job descriptions per request")
+    jobs = []
+    for index, item in enumerate(items):
+        if isinstance(item, str):
+            item = {"text": item}
+        if not isinstance(item, dict) or not isinstance(item.get("text"), str) or not item["text"].strip():
+            raise ValueError(f"Job description {index} has no text")
+        jobs.append({"id": item.get("id", index), "title": item.get("title"), "text": item["text"]})
+    return jobs
+
+
+@app.route('/api/match/rank', methods=['POST'])
+def rank_job_descriptions():
+    """Rank many job descriptions for one resume; only the best ``top_k`` get an LLM analysis.
+    
+    The resume is extracted and tokenized once, and every description is scored in one
+    NumPy pass (scoring.match_jobs). The top ``top_k`` then go through run_analysis, in
+    parallel, so they share the result cache with /api/analyze.
+    """
+    try:
+        jobs = read_job_descriptions(request.form)
+        top_k = min(int(request.form.get('top_k', MATCH_TOP_K)), MATCH_MAX_TOP_K)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not jobs:
+        return jsonify({"error": "No job descriptions given"}), 400
+    job_role = request.form.get('job_role', '')
+    role = job_role if job_role.strip() else None
+    
+    file = request.files.get('file')
+    try:
+        with stage("extract"):
+            document = extract_upload(file) if file else None
+    except Exception as e:
+        record_error('rank_job_descriptions', e)
+        return jsonify({"error": str(e)}), 500
+    text = document.text if document else request.form.get('resume_text', '')
+    if not text.strip():
+        return jsonify({"error": "No resume file or resume_text given"}), 400
+    
+    with stage("match"):
+        reports = match_jobs(text, [job["text"] for job in jobs], role)
+    ranking = [
+        dict(job, index=index, match=report)
+        for index, (job, report) in enumerate(zip(jobs, reports))
+    ]
+    ranking.sort(key=lambda r: (r["match"] is None, -(r["match"] or {}).get("match_percentage", 0),
+                                -(r["match"] or {}).get("requirement_coverage", 0), r["index"]))
+    for entry in ranking:
+        del entry["text"]
+    
+    meta = {"job_descriptions": len(jobs), "analyzed": 0, "degraded": 0}
+    client = get_llm_client() if top_k > 0 else None
+    if top_k > 0 and not client:
+        meta["analysis_skipped"] = "GROQ_API_KEY not configured"
+    top, seen = [], set()
+    for entry in (ranking if client else []):
+        # A posting saved twice is analyzed once.
+        job_text = normalize_text(jobs[entry["index"]]["text"])
+        if entry["match"] is not None and job_text not in seen and len(top) < top_k:
+            seen.add(job_text)
+            top.append(entry)
+    if top:
+        file_type = file_type_of(file.filename) if file else "TXT"
+        pages = document.pages_total if document else None
         
-        raw = response.choices[0].message.content
-        data = parse_ai_json(raw)
+        def analyze(entry):
+            job_desc = jobs[entry["index"]]["text"]
+            local = score_resume(text, job_desc, role, file_type, pages)
+            return run_analysis(client, text, job_desc, role, local=local)
         
-        if data:
-            return jsonify(data)
-        else:
-            return jsonify({"error": "Could not parse structured output", "raw": raw}), 500
+        with ThreadPoolExecutor(max_workers=len(top)) as pool:
+            futures = [(entry, pool.submit(analyze, entry)) for entry in top]
+            for entry, future in futures:
+                try:
+                    entry["analysis"], entry["_meta"] = future.result()
+                    # With every circuit open the analysis is the local scores; the model never saw it.
+                    meta["degraded" if entry["_meta"].get("degraded") else "analyzed"] += 1
+                except Exception as e:
+                    record_error('rank_job_descriptions', e)
+                    entry["error"] = str(e)
+    if document:
+        meta["extraction"] = document.meta()
+    return jsonify({"ranking": ranking, "_meta": meta})
+
+
+@app.route('/api/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """Analyze many resumes against one job description, streaming NDJSON lines.
+    
+    Emits one ``result`` or ``error`` line per file as it finishes, then a
+    ``summary`` line ranking the resumes by job match percentage.
+    """
+    client = get_llm_client()
+    
+    if not client:
+        return jsonify({"error": "GROQ_API_KEY not configured"}), 500
+    
+    files = request.files.getlist('files') + request.files.getlist('file')
+    if not files:
+        return jsonify({"error": "No file uploaded"}), 400
+    
+    job_description = request.form.get('job_description', '')
+    job_role = request.form.get('job_role', '')
+    job_desc = job_description if job_description.strip() else None
+    role = job_role if job_role.strip() else None
+    
+    try:
+        items = read_batch_uploads(files)
+    except (ValueError, zipfile.BadZipFile) as e:
+        return jsonify({"error": str(e)}), 400
+    if not items:
+        return jsonify({"error": "No PDF or TXT resumes found in upload"}), 400
+    
+    context = build_prompt_context(compact_job_description(job_desc), role)
+    
+    def generate():
+        ranking = []
+        failed = 0
+        extracted = {}
+        # Extraction threads only wait on the extraction process pool, so size them to match it.
+        with ThreadPoolExecutor(max_workers=EXTRACT_WORKERS) as extract_pool, \
+                ThreadPoolExecutor(max_workers=BATCH_LLM_CONCURRENCY) as llm_pool:
+            pending = {}
+            for index, (name, data) in enumerate(items):
+                future = extract_pool.submit(extract_document, name, data)
+                pending[future] = ("extract", index, name)
             
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step, index, name = pending.pop(future)
+                    line = {"index": index, "file": name}
+                    try:
+                        if step == "extract":
+                            document = extracted[index] = future.result()
+                            if not document.text.strip():
+                                raise ValueError("File has no extractable content")
+                            local = score_resume(document.text, job_desc, role, file_type_of(name), document.pages_total)
+                            analysis = llm_pool.submit(run_analysis, client, document.text, job_desc, role, context, local)
+                            pending[analysis] = ("analyze", index, name)
+                            continue
+                        data, meta = future.result()
+                        meta["extraction"] = extracted.pop(index).meta()
+                        match = (data.get("job_match") or {}).get("match_percentage")
+                        ranking.append({
+                            "index": index,
+                            "file": name,
+                            "match_percentage": match,
+                            "ats_score": data.get("ats_score"),
+                        })
+                        line.update(type="result", result=data, _meta=meta)
+                    except Exception as e:
+                        # Drop the document now rather than holding its text until the batch ends.
+                        extracted.pop(index, None)
+                        failed += 1
+                        record_error('analyze_batch', e)
+                        line.update(type="error", error=str(e))
+                    yield json.dumps(line) + "\n"
+        
+        ranking.sort(key=lambda r: (r["match_percentage"] is None, -(r["match_percentage"] or 0), -(r["ats_score"] or 0)))
+        yield json.dumps({
+            "type": "summary",
+            "total": len(items),
+            "succeeded": len(ranking),
+            "failed": failed,
+            "ranking": ranking,
+        }) + "\n"
+    
+    return Response(generate(), mimetype='application/x-ndjson', headers={'X-Accel-Buffering': 'no'})
+
+
+def process_job(payload):
+    """Job handler: analyze extracted text queued by /api/jobs."""
+    client = get_llm_client()
+    if not client:
+        raise RuntimeError("GROQ_API_KEY not configured")
+    text, job_desc, role = payload["resume_text"], payload.get("job_desc"), payload.get("role")
+    local = score_resume(text, job_desc, role, payload.get("file_type", "PDF"), payload.get("pages"))
+    # A job is retried later rather than finished with local scores only.
+    data, meta = run_analysis(client, text, job_desc, role, local=local, degrade=False)
+    meta["extraction"] = payload.get("extraction")
+    return dict(data, _meta=meta)
+
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    """Queue an analysis and return its id at once; poll GET /api/jobs/<id> or pass callback_url."""
+    if not get_llm_client():
+        return jsonify({"error": "GROQ_API_KEY not configured"}), 500
+    
+    if 'file' not in request.files:
+        return jsonify({"error": "No file uploaded"}), 400
+    
+    file = request.files['file']
+    job_description = request.form.get('job_description', '')
+    job_role = request.form.get('job_role', '')
+    callback_url = request.form.get('callback_url', '').strip() or None
+    
+    try:
+        # Text is extracted up front: the upload does not outlive this request.
+        with stage("extract"):
+            document = extract_upload(file)
     except Exception as e:
+        record_error('create_job', e)
         return jsonify({"error": str(e)}), 500
+    if not document.text.strip():
+        return jsonify({"error": "File has no extractable content"}), 400
+    
+    queue = get_job_queue()
+    queue.start(process_job)
+    try:
+        job_id = queue.enqueue({
+            "resume_text": document.text,
+            "job_desc": job_description if job_description.strip() else None,
+            "role": job_role if job_role.strip() else None,
+            "file_type": file_type_of(file.filename),
+            "pages": document.pages_total,
+            "extraction": document.meta(),
+        }, callback_url)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"id": job_id, "status": "queued", "poll": f"/api/jobs/{job_id}"}), 202, {
+        'Location': f"/api/jobs/{job_id}",
+    }
+
+
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    queue = get_job_queue()
+    # Also resumes jobs left in a SQLite queue by an earlier process.
+    queue.start(process_job)
+    job = queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job)
+
+
+@app.route('/api/jobs/stats')
+def job_stats():
+    return jsonify(get_job_queue().stats())
+
+
+@app.errorhandler(413)
+def upload_too_large(e):
+    return jsonify({"error": f"Upload exceeds the {request.max_content_length // (1024 * 1024)} MB limit"}), 413
+
+
+@app.route('/api/llm/stats')
+def llm_stats():
+    router = get_router()
+    stats = router.stats() if router else {"backends": []}
+    return jsonify(dict(stats, pool=pool_stats(), clients=client_limiter.stats() if client_limiter else None))
+
+
+def _cache_counts(field):
+    return {
+        (name,): cache.stats()[field]
+        for name, cache in (("results", get_result_cache()), ("extracted_text", get_text_cache()),
+                            ("near_duplicates", get_near_duplicate_index()), ("job_descriptions", get_jd_store()))
+    }
+
+
+metrics.REGISTRY.register(metrics.CallbackCounter(
+    "resume_cache_hits_total", "Cache lookups that found an entry.", ["cache"], lambda: _cache_counts("hits")))
+metrics.REGISTRY.register(metrics.CallbackCounter(
+    "resume_cache_misses_total", "Cache lookups that found nothing.", ["cache"], lambda: _cache_counts("misses")))
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+
+@app.route('/api/cache/stats')
+def cache_stats():
+    return jsonify({
+        "results": get_result_cache().stats(),
+        "extracted_text": get_text_cache().stats(),
+        "near_duplicates": get_near_duplicate_index().stats(),
+        "job_descriptions": get_jd_store().stats(),
+    })
+
+
+def is_admin():
+    header = request.headers.get('Authorization', '')
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(header.encode(), f"Bearer {ADMIN_TOKEN}".encode())
+
+
+@app.route('/api/jd/top')
+def top_job_descriptions():
+    """Digests, lengths and lookup counts of the most used job descriptions in this process.
+    
+    With ``text=1`` and the admin token, each entry also carries the posting's text and
+    keywords, in the format JD_STORE_WARM_FILE loads.
+    """
+    limit = request.args.get('limit', 20, type=int)
+    with_text = request.args.get('text') == '1'
+    if with_text and not is_admin():
+        return jsonify({"error": "Posting text requires the admin token"}), 403
+    top = get_jd_store().top(limit, with_text=with_text)
+    if with_text:
+        for item in top:
+            item["keywords"] = list(job_profile(item["text"]).keywords[:10])
+    return jsonify(top)
 
 
 @app.route('/api/contact', methods=['POST'])
@@ -0,0 +1,119 @@
+"""Async (ASGI) variant of the analysis API.
+
+Run with: uvicorn asgi_app:app --host 0.0.0.0 --port $PORT
+"""
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from quart import Quart, request, jsonify
+
+from app import (
+    MAX_UPLOAD_BYTES,
+    PROXY_FIX_X_FOR,
+    AnalysisParseError,
+    client_limiter,
+    extract_upload,
+    file_type_of,
+    get_llm_client,
+    run_analysis,
+)
+from limiter import ConcurrencyLimiter, QueueFull
+from metrics import record_error, stage
+from ratelimit import RateLimited, client_address
+from resilience import DeadlineExceeded
+from scoring import score_resume
+
+app = Quart(__name__)
+# Enforced while the body is read; larger uploads get 413, as on the Flask app.
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES
+
+upstream_limiter = ConcurrencyLimiter(
+    max_inflight=int(os.getenv("UPSTREAM_MAX_INFLIGHT", "32")),
+    max_queue=int(os.getenv("UPSTREAM_MAX_QUEUE", "256")),
+)
+
+# One thread per limiter slot: run_analysis blocks for the whole upstream call.
+analysis_executor = ThreadPoolExecutor(max_workers=upstream_limiter.max_inflight, thread_name_prefix="analysis")
+
+
+def rate_limited(e):
+    return jsonify({"error": str(e), "retry_after": e.retry_after}), 429, {"Retry-After": str(e.retry_after)}
+
+
+@app.before_request
+async def limit_clients():
+    # Same per-IP budget as the Flask endpoints (app.client_limiter).
+    if client_limiter and request.endpoint == 'analyze_resume':
+        try:
+            client_limiter.check(client_address(
+                request.remote_addr, request.headers.get("X-Forwarded-For"), PROXY_FIX_X_FOR))
+        except RateLimited as e:
+            record_error(request.endpoint, e)
+            return rate_limited(e)
+
+
+@app.errorhandler(413)
+async def too_large(e):
+    return jsonify({"error": f"Upload exceeds the {MAX_UPLOAD_BYTES // (1024 * 1024)} MB limit"}), 413
+
+
+@app.route('/api/analyze', methods=['POST'])
+async def analyze_resume():
+    """Same analysis as the Flask /api/analyze: the blocking work runs on threads, off the event loop."""
+    form = await request.form
+    fast = form.get('mode') == 'fast'
+    client = None if fast else get_llm_client()
+
+    if not fast and not client:
+        return jsonify({"error": "GROQ_API_KEY not configured"}), 500
+
+    files = await request.files
+    if 'file' not in files:
+        return jsonify({"error": "No file uploaded"}), 400
+
+    file = files['file']
+    job_description = form.get('job_description', '')
+    job_role = form.get('job_role', '')
+
+    try:
+        with stage("extract"):
+            document = await asyncio.to_thread(extract_upload, file)
+        file_content = document.text
+
+        if not file_content.strip():
+            return jsonify({"error": "File has no extractable content"}), 400
+
+        job_desc = job_description if job_description.strip() else None
+        role = job_role if job_role.strip() else None
+        with stage("score"):
+            local = await asyncio.to_thread(
+                score_resume, file_content, job_desc, role, file_type_of(file.filename), document.pages_total)
+        if fast:
+            return jsonify(dict(local, _meta={"mode": "fast", "extraction": document.meta()}))
+
+        async with upstream_limiter.slot():
+            data, meta = await asyncio.get_running_loop().run_in_executor(
+                analysis_executor, functools.partial(run_analysis, client, file_content, job_desc, role, local=local))
+        meta["extraction"] = document.meta()
+        return jsonify(dict(data, _meta=meta))
+
+    except QueueFull as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": str(e.retry_after)}
+    except AnalysisParseError as e:
+        record_error('analyze_resume', e)
+        return jsonify({"error": str(e), "raw": e.raw}), 500
+    except RateLimited as e:
+        record_error('analyze_resume', e)
+        return rate_limited(e)
+    except DeadlineExceeded as e:
+        record_error('analyze_resume', e)
+        return jsonify({"error": str(e)}), 504
+    except Exception as e:
+        record_error('analyze_resume', e)
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/limiter/stats')
+async def limiter_stats():
+    return jsonify(upstream_limiter.stats())
@@ -0,0 +1,149 @@
+"""Corpus check and benchmark for json_repair.
+
+    python benchmarks/bench_json_repair.py [--iterations N]
+
+Checks every case in tests/json_repair_corpus.jsonl (tests/test_json_repair.py also
+covers chunked feeding). Then cuts a full analysis answer at every 2% of its length to
+measure how much of a truncated answer is recovered.
+The old regex-based parser is run alongside for comparison. Prints a JSON report
+and exits non-zero if a corpus case fails.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from analysis_schema import template  # noqa: E402
+from json_repair import complete, parse_json  # noqa: E402
+
+CORPUS = os.path.join(ROOT, "tests", "json_repair_corpus.jsonl")
+
+# What the model is asked for: the shape of analysis_schema.template(). Job match figures
+# other than the skill gap are computed locally (scoring.py).
+SAMPLE_ANSWER = {
+    "resume_summary": "Backend engineer with six years of Python and Go experience building payment APIs.",
+    "skills": {
+        "found_technical": ["Python", "Go", "PostgreSQL", "Kubernetes", "AWS", "Kafka"],
+        "found_soft": ["Mentoring", "Communication", "Ownership"],
+        "missing": ["Terraform", "GraphQL"],
+    },
+    "job_match": {
+        "skill_gap_analysis": "Strong backend fit; infrastructure-as-code experience is not shown.",
+    },
+    "keywords": {
+        "density_analysis": "Core backend terms appear in most bullets.",
+        "present": ["python", "postgresql", "kubernetes"],
+        "missing": ["terraform"],
+        "suggested": ["observability", "ci/cd"],
+    },
+    "experience": {
+        "years": 6,
+        "roles": ["Software Engineer", "Senior Software Engineer"],
+        "career_progression": "Steady progression from engineer to senior engineer",
+    },
+    "education": [
+        {"degree": "BS Computer Science", "university": "State University", "year": "2018", "relevance": "Relevant"},
+    ],
+    "strengths": ["Quantified impact on latency and cost", "Clear section structure"],
+    "weaknesses": ["Summary is generic", "No links to projects"],
+    "improvements": ["Add Terraform work if any", "Tailor the summary to the role", "Link a GitHub profile"],
+    "bonus_metrics": {"grammar_score": 92},
+}
+
+
+def legacy_parse(text):
+    """The parser app.py used before json_repair."""
+    text = text.strip()
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    match = re.search(r"\{[\s\S]*\}", text)
+    if match:
+        try:
+            return json.loads(match.group())
+        except ValueError:
+            pass
+    return None
+
+
+def _count_leaves(value):
+    if isinstance(value, dict):
+        return sum(_count_leaves(v) for v in value.values())
+    if isinstance(value, list):
+        return sum(_count_leaves(v) for v in value)
+    return 0 if value is None else 1
+
+
+def _time(fn, inputs, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for text in inputs:
+            fn(text)
+    return (time.perf_counter() - started) / (iterations * len(inputs)) * 1e6
+
+
+def run_corpus(iterations):
+    with open(CORPUS) as f:
+        cases = [json.loads(line) for line in f if line.strip()]
+    failures = []
+    legacy_ok = 0
+    for case in cases:
+        got, repairs = parse_json(case["input"])
+        if got != case["expect"]:
+            failures.append({"name": case["name"], "expected": case["expect"], "got": got, "repairs": repairs})
+        if legacy_parse(case["input"]) == case["expect"]:
+            legacy_ok += 1
+    inputs = [case["input"] for case in cases]
+    return {
+        "cases": len(cases),
+        "passed": len(cases) - len(failures),
+        "legacy_passed": legacy_ok,
+        "failures": failures,
+        "us_per_parse": round(_time(parse_json, inputs, iterations), 2),
+        "legacy_us_per_parse": round(_time(legacy_parse, inputs, iterations), 2),
+    }
+
+
+def run_truncation(iterations):
+    full = json.dumps(SAMPLE_ANSWER, indent=2)
+    total_leaves = _count_leaves(SAMPLE_ANSWER)
+    cuts = [full[:len(full) * pct // 100] for pct in range(2, 100, 2)]
+    parsed = legacy_ok = 0
+    recovered = 0.0
+    missing = 0
+    for text in cuts:
+        data, _ = parse_json(text)
+        if isinstance(data, dict):
+            parsed += 1
+            recovered += _count_leaves(data) / total_leaves
+            missing += len(complete(data, template())[1])
+        if legacy_parse(text) is not None:
+            legacy_ok += 1
+    return {
+        "cuts": len(cuts),
+        "parsed": parsed,
+        "legacy_parsed": legacy_ok,
+        "mean_fields_recovered": round(recovered / len(cuts), 3),
+        "mean_missing_fields": round(missing / len(cuts), 2),
+        "us_per_parse": round(_time(parse_json, cuts, iterations), 2),
+        "answer_bytes": len(full),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    report = {"corpus": run_corpus(args.iterations), "truncation": run_truncation(args.iterations)}
+    print(json.dumps(report, indent=2))
+    return 1 if report["corpus"]["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,306 @@
+"""End-to-end benchmark of the analysis pipeline against a local mock LLM.
+
+    python benchmarks/bench_pipeline.py [--concurrency 1,4,16] [--requests 48]
+        [--latency 0.3] [--tokens-per-second 400] [--output results.json]
+        [--compare baseline.json]
+
+Starts benchmarks/mock_llm.py in-process, points the router at it and builds the
+synthetic corpus from benchmarks/corpus.py. Then, at each concurrency level:
+
+- ``api``: POSTs the documents to ``/api/analyze`` on a threaded local server.
+  Stage times come from the app's own stage histograms (see metrics.py).
+- ``streamlit``: runs the Analyze page's steps directly, each one timed:
+  ``extract_text_from_file``, ``build_analysis_prompt``, the LLM call and
+  ``parse_ai_json``.
+
+Each document carries a unique nonce, so the extraction and result caches never
+hit. Documents of the same corpus entry differ only in that nonce, so near-duplicate
+reuse is switched off as well (NEAR_DUPLICATE_THRESHOLD=0) and every request reaches
+the mock LLM. Pass ``--cache`` to reuse documents, with near-duplicate reuse left as
+configured, and measure the cached path instead.
+Reports throughput, p50/p95/p99 latency, error counts and RSS as JSON. With
+``--compare``, it also prints the relative change of each figure against an
+earlier report.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from corpus import DEFAULT_CORPUS, make_document  # noqa: E402
+from mock_llm import MockLLMServer  # noqa: E402
+
+CONTENT_TYPES = {"pdf": "application/pdf", "txt": "text/plain"}
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))]
+
+
+def summarize(latencies):
+    return {
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "mean": sum(latencies) / len(latencies) if latencies else None,
+    }
+
+
+def rss_mb():
+    """Current and peak resident set size of this process (extraction workers excluded)."""
+    current = None
+    try:
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak = peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+    return {"current": round(current, 1) if current else None, "peak": round(peak, 1)}
+
+
+def build_requests(count, reuse, seed):
+    """(spec, bytes) pairs cycling through the corpus; generated before timing starts."""
+    return [
+        (spec, make_document(spec, seed, "" if reuse else uuid.uuid4().hex))
+        for spec in (DEFAULT_CORPUS[i % len(DEFAULT_CORPUS)] for i in range(count))
+    ]
+
+
+def multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, content_type, data) in files.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                     f"Content-Type: {content_type}\r\n\r\n".encode() + data + b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def run_level(work, items, concurrency):
+    """Run ``work(item)`` over ``items`` with ``concurrency`` threads; returns results and wall time."""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(work, items))
+    return results, time.perf_counter() - started
+
+
+def level_report(results, wall):
+    ok = [r for r in results if r["ok"]]
+    latencies = [r["seconds"] for r in ok]
+    return {
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(ok) / wall, 3) if wall else None,
+        "latency": {k: round(v, 4) if v is not None else None for k, v in summarize(latencies).items()},
+        "rss_mb": rss_mb(),
+    }
+
+
+def stage_snapshot(histogram):
+    return {key[0]: value for key, value in histogram.totals().items()}
+
+
+def stage_delta(before, after):
+    stages = {}
+    for stage, (count, total) in after.items():
+        count0, total0 = before.get(stage, (0, 0.0))
+        if count > count0:
+            stages[stage] = {"count": count - count0, "mean": round((total - total0) / (count - count0), 5)}
+    return stages
+
+
+def bench_api(levels, count, reuse, seed, job_description):
+    import metrics
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    from app import app
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, name="bench-api", daemon=True).start()
+    port = server.server_address[1]
+
+    def post(item):
+        spec, data = item
+        body, content_type = multipart({"job_description": job_description},
+                                       {"file": (spec.name, CONTENT_TYPES[spec.kind], data)})
+        started = time.perf_counter()
+        conn = HTTPConnection("127.0.0.1", port, timeout=120)
+        try:
+            conn.request("POST", "/api/analyze", body, {"Content-Type": content_type})
+            response = conn.getresponse()
+            payload = response.read()
+            ok = response.status == 200
+        except OSError as e:
+            ok, payload = False, str(e).encode()
+        finally:
+            conn.close()
+        return {"ok": ok, "seconds": time.perf_counter() - started, "error": None if ok else payload[:200].decode()}
+
+    report = {}
+    try:
+        for concurrency in levels:
+            items = build_requests(count, reuse, seed)
+            before = stage_snapshot(metrics.STAGE_SECONDS)
+            results, wall = run_level(post, items, concurrency)
+            report[str(concurrency)] = dict(level_report(results, wall),
+                                            stages=stage_delta(before, stage_snapshot(metrics.STAGE_SECONDS)))
+            errors = [r["error"] for r in results if not r["ok"]]
+            if errors:
+                report[str(concurrency)]["first_error"] = errors[0]
+    finally:
+        server.shutdown()
+    return report
+
+
+class UploadedFile(io.BytesIO):
+    """Stands in for streamlit's UploadedFile, which is a BytesIO with a name and type."""
+
+    def __init__(self, data, name, content_type):
+        super().__init__(data)
+        self.name = name
+        self.type = content_type
+
+
+def bench_streamlit(levels, count, reuse, seed, job_description):
+    try:
+        from utils import extract_text_from_file, parse_ai_json
+    except ImportError as e:
+        return {"skipped": f"streamlit code path unavailable: {e}"}
+    from analysis_schema import build_analysis_prompt, build_messages, completion_params
+    from compaction import compact_inputs
+    from llm_router import get_router
+
+    router = get_router()
+
+    def analyze(item):
+        spec, data = item
+        stages = {}
+        started = time.perf_counter()
+        try:
+            upload = UploadedFile(data, spec.name, CONTENT_TYPES[spec.kind])
+            t = time.perf_counter()
+            text = extract_text_from_file(upload)
+            stages["extract_text_from_file"] = time.perf_counter() - t
+            t = time.perf_counter()
+            compacted = compact_inputs(text, job_description or None)
+            prompt = build_analysis_prompt(compacted.resume, compacted.job_desc, None)
+            stages["build_analysis_prompt"] = time.perf_counter() - t
+            t = time.perf_counter()
+            response, _ = router.create(build_messages(prompt), **completion_params())
+            stages["llm"] = time.perf_counter() - t
+            t = time.perf_counter()
+            ok = parse_ai_json(response.choices[0].message.content) is not None
+            stages["parse_ai_json"] = time.perf_counter() - t
+        except Exception as e:
+            return {"ok": False, "seconds": time.perf_counter() - started, "error": str(e), "stages": stages}
+        return {"ok": ok, "seconds": time.perf_counter() - started, "error": None, "stages": stages}
+
+    report = {}
+    for concurrency in levels:
+        results, wall = run_level(analyze, build_requests(count, reuse, seed), concurrency)
+        stages = {}
+        for name in ("extract_text_from_file", "build_analysis_prompt", "llm", "parse_ai_json"):
+            values = [r["stages"][name] for r in results if name in r["stages"]]
+            if values:
+                stages[name] = {k: round(v, 5) for k, v in summarize(values).items()}
+        report[str(concurrency)] = dict(level_report(results, wall), stages=stages)
+    return report
+
+
+def compare(current, baseline, path=""):
+    """Relative change of every number present in both reports, keyed by dotted path."""
+    changes = {}
+    for key, value in current.items():
+        old = baseline.get(key) if isinstance(baseline, dict) else None
+        where = f"{path}{key}"
+        if isinstance(value, dict) and isinstance(old, dict):
+            changes.update(compare(value, old, where + "."))
+        elif isinstance(value, (int, float)) and isinstance(old, (int, float)) and old:
+            changes[where] = round((value - old) / old * 100, 1)
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated levels")
+    parser.add_argument("--requests", type=int, default=48, help="requests per level")
+    parser.add_argument("--latency", type=float, default=0.3, help="mock LLM seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=400.0, help="mock LLM output rate")
+    parser.add_argument("--job-description", default="Backend engineer: Python, PostgreSQL, Kubernetes, AWS.")
+    parser.add_argument("--paths", default="api,streamlit", help="which code paths to run")
+    parser.add_argument("--cache", action="store_true", help="reuse documents so the caches hit")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="earlier JSON report to compare against")
+    args = parser.parse_args()
+
+    mock = MockLLMServer(latency=args.latency, tokens_per_second=args.tokens_per_second)
+    os.environ["LLM_BACKENDS"] = json.dumps([{"name": "mock", "base_url": mock.start(), "model": "mock",
+                                              "api_key": "benchmark"}])
+    # The per-IP limit would reject a benchmark client after a handful of requests.
+    os.environ["CLIENT_RATE_PER_MINUTE"] = "0"
+    if not args.cache:
+        # Same-spec documents are near-duplicates; reusing them would skip the LLM calls being measured.
+        os.environ["NEAR_DUPLICATE_THRESHOLD"] = "0"
+    levels = [int(level) for level in args.concurrency.split(",")]
+    paths = args.paths.split(",")
+
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "config": {
+            "concurrency": levels,
+            "requests_per_level": args.requests,
+            "mock_latency": args.latency,
+            "mock_tokens_per_second": args.tokens_per_second,
+            "cache": args.cache,
+            "corpus": [spec.name for spec in DEFAULT_CORPUS],
+        },
+    }
+    if "api" in paths:
+        report["api"] = bench_api(levels, args.requests, args.cache, args.seed, args.job_description)
+    if "streamlit" in paths:
+        report["streamlit"] = bench_streamlit(levels, args.requests, args.cache, args.seed, args.job_description)
+    report["mock_requests"] = mock.requests
+    mock.stop()
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        report["change_percent"] = compare(
+            {k: report[k] for k in ("api", "streamlit") if k in report},
+            {k: baseline[k] for k in ("api", "streamlit") if k in baseline},
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Bytes the Streamlit pages send to the browser per rerun.
+
+    python benchmarks/bench_streamlit_payload.py [--page main.py ...]
+
+Runs each page headless with streamlit.testing.v1.AppTest, twice: a first load
+and a rerun, as after any widget interaction. For each run it reports the
+serialized size of every element the script emitted, and separately the size of
+the elements that carry <style>: markdown blocks, or the component that adds the
+stylesheet on a session's first run. The elements approximate the page's
+websocket payload. Prints a JSON report.
+"""
+import argparse
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+PAGES = ["main.py", "pages/1_Analyze.py", "pages/2_About.py", "pages/3_Contact.py", "pages/4_Privacy_Policy.py"]
+
+
+def _elements(node):
+    children = getattr(node, "children", None)
+    if children:
+        for child in children.values():
+            yield from _elements(child)
+    elif getattr(node, "proto", None) is not None:
+        yield node
+
+
+def measure(at):
+    total = style = count = 0
+    for element in _elements(at._tree):
+        size = len(element.proto.SerializeToString())
+        total += size
+        count += 1
+        if element.type == "markdown" and "<style" in element.value:
+            style += size
+        elif element.type == "iframe" and "app-css" in str(element.proto):
+            style += size
+    return {"elements": count, "bytes": total, "style_bytes": style}
+
+
+def run_page(path):
+    at = AppTest.from_file(os.path.join(ROOT, path), default_timeout=30)
+    first = measure(at.run())
+    if at.exception:
+        return {"error": str(at.exception[0].value)}
+    rerun = measure(at.run())
+    if at.exception:
+        return {"error": str(at.exception[0].value)}
+    return {"first_run": first, "rerun": rerun}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--page", action="append", help="page to measure (default: all)")
+    args = parser.parse_args()
+    os.chdir(ROOT)
+    report = {page: run_page(page) for page in args.page or PAGES}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Synthetic resumes as TXT and PDF files of chosen size and page count.
+
+    python benchmarks/corpus.py OUTPUT_DIR
+
+Writes the default corpus to OUTPUT_DIR. The benchmarks build the same documents
+in memory. Text is generated from a seed, so a corpus is identical across runs.
+The ``nonce`` argument makes otherwise equal documents distinct, so benchmark
+requests do not hit the extraction or result caches.
+"""
+import os
+import random
+import sys
+from dataclasses import dataclass
+
+SKILLS = [
+    "Python", "Go", "Java", "TypeScript", "React", "PostgreSQL", "Redis", "Kafka", "Docker",
+    "Kubernetes", "AWS", "GCP", "Terraform", "GraphQL", "REST APIs", "CI/CD", "Linux", "Spark",
+    "Airflow", "Pandas", "Machine Learning", "Observability", "gRPC", "Microservices",
+]
+VERBS = ["Built", "Designed", "Led", "Migrated", "Optimized", "Automated", "Shipped", "Scaled", "Reduced", "Owned"]
+OBJECTS = [
+    "a payments API", "the billing pipeline", "an internal search service", "the CI system",
+    "a data warehouse", "customer onboarding flows", "the mobile backend", "alerting and dashboards",
+]
+RESULTS = [
+    "cutting p95 latency by {n}%", "saving ${n}k per year", "serving {n}M requests per day",
+    "raising test coverage to {n}%", "for a team of {n} engineers", "reducing incidents by {n}%",
+]
+
+
+@dataclass(frozen=True)
+class DocSpec:
+    name: str
+    kind: str  # "pdf" or "txt"
+    pages: int
+    words_per_page: int
+
+
+DEFAULT_CORPUS = [
+    DocSpec("short.txt", "txt", 1, 250),
+    DocSpec("long.txt", "txt", 3, 600),
+    DocSpec("one-page.pdf", "pdf", 1, 400),
+    DocSpec("two-page.pdf", "pdf", 2, 450),
+    DocSpec("five-page.pdf", "pdf", 5, 450),
+    DocSpec("cv-twelve-page.pdf", "pdf", 12, 500),
+]
+
+
+def _bullet(rng):
+    result = rng.choice(RESULTS).format(n=rng.randint(2, 95))
+    return f"- {rng.choice(VERBS)} {rng.choice(OBJECTS)} with {rng.choice(SKILLS)} and {rng.choice(SKILLS)}, {result}."
+
+
+def resume_pages(spec, seed=0, nonce=""):
+    """Lines of text per page for ``spec``."""
+    rng = random.Random(f"{seed}:{spec.name}")
+    pages = []
+    for page in range(spec.pages):
+        lines = []
+        if page == 0:
+            lines += ["Jordan Example", "jordan@example.com | +1 555 0100 | github.com/example", "",
+                      "SUMMARY", "Software engineer with experience in backend systems and data platforms.", "",
+                      "SKILLS", ", ".join(rng.sample(SKILLS, 12)), "", "EXPERIENCE"]
+        words = sum(len(line.split()) for line in lines)
+        while words < spec.words_per_page:
+            if rng.random() < 0.15:
+                lines += ["", f"Senior Engineer, Company {rng.randint(1, 99)} ({rng.randint(2012, 2024)} - present)"]
+            bullet = _bullet(rng)
+            lines.append(bullet)
+            words += len(bullet.split())
+        if page == spec.pages - 1:
+            lines += ["", "EDUCATION", "BS Computer Science, State University, 2016"]
+        pages.append(lines)
+    if nonce:
+        # On the first page: compaction truncates long resumes from the end.
+        pages[0].insert(2, f"Reference {nonce}")
+    return pages
+
+
+def make_txt(pages):
+    return "\n\n".join("\n".join(lines) for lines in pages).encode("utf-8")
+
+
+def _pdf_string(text):
+    return "(" + text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+def make_pdf(pages):
+    """Minimal PDF 1.4 with one Helvetica text stream per page."""
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    pages_id = add(b"")
+    kids = []
+    for lines in pages:
+        ops = " ".join(f"{_pdf_string(line)} '" for line in lines)
+        content = f"BT /F1 10 Tf 50 780 Td 12 TL {ops} ET".encode("latin-1", "replace")
+        stream = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+        kids.append(add(b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] /Contents %d 0 R "
+                        b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (pages_id, stream, font)))
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), len(kids))
+    catalog = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+    return bytes(out)
+
+
+def make_document(spec, seed=0, nonce=""):
+    """File bytes for ``spec``."""
+    pages = resume_pages(spec, seed, nonce)
+    return make_pdf(pages) if spec.kind == "pdf" else make_txt(pages)
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit(__doc__)
+    os.makedirs(sys.argv[1], exist_ok=True)
+    for spec in DEFAULT_CORPUS:
+        data = make_document(spec)
+        with open(os.path.join(sys.argv[1], spec.name), "wb") as f:
+            f.write(data)
+        print(f"{spec.name}: {spec.pages} pages, {len(data)} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Local OpenAI-compatible chat completions server for benchmarks and manual runs.
+
+    python benchmarks/mock_llm.py [--port 8001] [--latency 0.3] [--tokens-per-second 400]
+
+Answers ``POST /v1/chat/completions`` with a fixed, schema-shaped analysis, in one
+piece or as an SSE stream. It waits ``latency`` seconds before the first token, then
+sends tokens at ``tokens_per_second``. ``usage`` and ``x-ratelimit-*`` headers are
+filled in like the real API. Point the app at it with::
+
+    LLM_BACKENDS='[{"name": "mock", "base_url": "http://127.0.0.1:8001/v1", "model": "mock", "api_key": "test"}]'
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_json_repair import SAMPLE_ANSWER  # noqa: E402
+from compaction import estimate_tokens  # noqa: E402
+
+# Characters per streamed chunk; roughly what the real API sends.
+CHUNK_CHARS = 16
+
+
+class MockLLMServer:
+    """Threaded mock server; ``start()`` returns its ``/v1`` base URL."""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.3, tokens_per_second=400.0, answer=None):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.answer = json.dumps(answer or SAMPLE_ANSWER)
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-llm", daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with server._lock:
+                    server.requests += 1
+                prompt_tokens = sum(estimate_tokens(m.get("content") or "") for m in body.get("messages", []))
+                if body.get("stream"):
+                    server._stream(self, body, prompt_tokens)
+                else:
+                    server._complete(self, body, prompt_tokens)
+
+        return Handler
+
+    def _usage(self, prompt_tokens):
+        completion = estimate_tokens(self.answer)
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion,
+                "total_tokens": prompt_tokens + completion}
+
+    def _headers(self, handler, content_type, length=None):
+        handler.send_response(200)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("x-ratelimit-remaining-requests", "10000")
+        handler.send_header("x-ratelimit-remaining-tokens", "1000000")
+        if length is None:
+            handler.send_header("Transfer-Encoding", "chunked")
+        else:
+            handler.send_header("Content-Length", str(length))
+        handler.end_headers()
+
+    def _generation_time(self, text):
+        return estimate_tokens(text) / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    def _complete(self, handler, body, prompt_tokens):
+        time.sleep(self.latency + self._generation_time(self.answer))
+        payload = json.dumps({
+            "id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": self.answer}}],
+            "usage": self._usage(prompt_tokens),
+        }).encode("utf-8")
+        self._headers(handler, "application/json", len(payload))
+        handler.wfile.write(payload)
+
+    def _stream(self, handler, body, prompt_tokens):
+        time.sleep(self.latency)
+        self._headers(handler, "text/event-stream")
+
+        def send(data):
+            chunk = f"data: {data}\n\n".encode("utf-8")
+            handler.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            handler.wfile.flush()
+
+        started = time.monotonic()
+        sent = ""
+        for i in range(0, len(self.answer), CHUNK_CHARS):
+            piece = self.answer[i:i + CHUNK_CHARS]
+            sent += piece
+            # Pace against the total so sleep granularity does not add up.
+            delay = started + self._generation_time(sent) - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            send(json.dumps({
+                "id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(started),
+                "model": body.get("model", "mock"),
+                "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+            }))
+        send(json.dumps({
+            "id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(started),
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "usage": self._usage(prompt_tokens),
+        }))
+        send("[DONE]")
+        handler.wfile.write(b"0\r\n\r\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=400.0)
+    args = parser.parse_args()
+    server = MockLLMServer(args.host, args.port, args.latency, args.tokens_per_second)
+    print(f"Mock LLM at {server.base_url}", flush=True)
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
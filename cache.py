@@ -0,0 +1,313 @@
+"""Result and extracted-text caches shared by the Flask API and the Streamlit Analyze page."""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_text(text):
+    """Collapse whitespace so cosmetic extraction differences share a key."""
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+def make_cache_key(resume_text, job_desc, role, model, prompt_version):
+    parts = [
+        normalize_text(resume_text),
+        normalize_text(job_desc),
+        normalize_text(role).lower(),
+        model,
+        str(prompt_version),
+    ]
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+
+class MemoryBackend:
+    """In-process LRU store of (expires_at, value) pairs."""
+
+    name = "memory"
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+
+    def get(self, key, now):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at <= now:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value, expires_at):
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteBackend:
+    """On-disk LRU store, shared between processes on the same host."""
+
+    name = "sqlite"
+
+    def __init__(self, path, max_entries=5000):
+        self.path = path
+        self.max_entries = max_entries
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_lru ON results(last_access)")
+
+    def get(self, key, now):
+        row = self._conn.execute(
+            "SELECT value, expires_at FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] <= now:
+            self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+            return None
+        self._conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key, value, expires_at):
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO results (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), expires_at, now),
+        )
+        self._conn.execute("DELETE FROM results WHERE expires_at <= ?", (now,))
+        excess = len(self) - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM results WHERE key IN "
+                "(SELECT key FROM results ORDER BY last_access ASC LIMIT ?)",
+                (excess,),
+            )
+
+    def clear(self):
+        self._conn.execute("DELETE FROM results")
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+class ResultCache:
+    """TTL cache for parsed analysis results with hit/miss counters."""
+
+    def __init__(self, backend, ttl=3600):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self.backend.get(key, time.time())
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def peek(self, key):
+        """Like ``get``, but not counted as a hit or miss."""
+        with self._lock:
+            return self.backend.get(key, time.time())
+
+    def set(self, key, value):
+        with self._lock:
+            self.backend.set(key, value, time.time() + self.ttl)
+
+    def clear(self):
+        with self._lock:
+            self.backend.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "backend": self.backend.name,
+                "size": len(self.backend),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Process-wide cache configured from RESULT_CACHE_* environment variables."""
+    global _result_cache
+    with _result_cache_lock:
+        if _result_cache is None:
+            ttl = int(os.getenv("RESULT_CACHE_TTL", "3600"))
+            max_entries = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "512"))
+            if os.getenv("RESULT_CACHE_BACKEND", "memory").lower() == "sqlite":
+                path = os.getenv("RESULT_CACHE_PATH", "result_cache.sqlite3")
+                backend = SQLiteBackend(path, max_entries=max_entries)
+            else:
+                backend = MemoryBackend(max_entries=max_entries)
+            _result_cache = ResultCache(backend, ttl=ttl)
+        return _result_cache
+
+
+def upload_digest(stream):
+    """BLAKE2 digest of an upload stream, read in chunks (or straight from a BytesIO buffer)."""
+    stream.seek(0)
+    digest = hashlib.file_digest(stream, lambda: hashlib.blake2b(digest_size=20)).hexdigest()
+    stream.seek(0)
+    return digest
+
+
+class TextCache:
+    """Extracted upload text keyed by content digest, LRU-bounded by total bytes.
+
+    With ``path`` set, entries are also written to SQLite so they survive restarts;
+    the disk copy has its own byte budget.
+    """
+
+    # Rows considered per eviction pass on disk.
+    EVICT_BATCH = 64
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, path=None, disk_max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS texts ("
+                "digest TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS texts_lru ON texts(last_access)")
+            # Running byte total, kept by triggers so processes sharing the file agree on it.
+            # recursive_triggers makes INSERT OR REPLACE fire the delete trigger for the old row.
+            self._conn.execute("PRAGMA recursive_triggers=ON")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS texts_total (bytes INTEGER NOT NULL)")
+            self._conn.execute(
+                "INSERT INTO texts_total SELECT (SELECT COALESCE(SUM(size), 0) FROM texts) "
+                "WHERE NOT EXISTS (SELECT 1 FROM texts_total)"
+            )
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS texts_added AFTER INSERT ON texts "
+                "BEGIN UPDATE texts_total SET bytes = bytes + NEW.size; END"
+            )
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS texts_removed AFTER DELETE ON texts "
+                "BEGIN UPDATE texts_total SET bytes = bytes - OLD.size; END"
+            )
+
+    @staticmethod
+    def _size(value):
+        return len(value.get("text", "").encode("utf-8"))
+
+    def _put_memory(self, digest, value, size):
+        if digest in self._data:
+            self._bytes -= self._data.pop(digest)[1]
+        if size > self.max_bytes:
+            return
+        self._data[digest] = (value, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, evicted) = self._data.popitem(last=False)
+            self._bytes -= evicted
+
+    def get(self, digest):
+        with self._lock:
+            item = self._data.get(digest)
+            if item is not None:
+                self._data.move_to_end(digest)
+                self.hits += 1
+                return item[0]
+            if self._conn is not None:
+                row = self._conn.execute("SELECT value, size FROM texts WHERE digest = ?", (digest,)).fetchone()
+                if row is not None:
+                    self._conn.execute("UPDATE texts SET last_access = ? WHERE digest = ?", (time.time(), digest))
+                    value = json.loads(row[0])
+                    self._put_memory(digest, value, row[1])
+                    self.hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    def set(self, digest, value):
+        size = self._size(value)
+        with self._lock:
+            self._put_memory(digest, value, size)
+            if self._conn is None:
+                return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO texts (digest, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (digest, json.dumps(value), size, time.time()),
+            )
+            while True:
+                excess = self._conn.execute("SELECT bytes FROM texts_total").fetchone()[0] - self.disk_max_bytes
+                if excess <= 0:
+                    break
+                # Oldest entries, from a bounded prefix of the LRU index, until ``excess`` bytes are freed.
+                self._conn.execute(
+                    "DELETE FROM texts WHERE digest IN ("
+                    "SELECT digest FROM (SELECT digest, size, SUM(size) OVER (ORDER BY last_access, digest) AS freed "
+                    "FROM (SELECT digest, size, last_access FROM texts ORDER BY last_access ASC LIMIT ?)) "
+                    "WHERE freed - size < ?)",
+                    (self.EVICT_BATCH, excess),
+                )
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "backend": "memory+sqlite" if self._conn is not None else "memory",
+                "size": len(self._data),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+_text_cache = None
+_text_cache_lock = threading.Lock()
+
+
+def get_text_cache():
+    """Process-wide extracted-text cache configured from TEXT_CACHE_* environment variables."""
+    global _text_cache
+    with _text_cache_lock:
+        if _text_cache is None:
+            _text_cache = TextCache(
+                max_bytes=int(os.getenv("TEXT_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+                path=os.getenv("TEXT_CACHE_PATH") or None,
+                disk_max_bytes=int(os.getenv("TEXT_CACHE_DISK_MAX_BYTES", str(512 * 1024 * 1024))),
+            )
+        return _text_cache
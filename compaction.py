@@ -0,0 +1,140 @@
+"""Prompt slimming: normalize resume/job-description text and fit it to a token budget."""
+import math
+import os
+import re
+from dataclasses import dataclass, field
+
+from jd_store import get_jd_store
+
+RESUME_TOKEN_BUDGET = int(os.getenv("PROMPT_RESUME_TOKEN_BUDGET", "3000"))
+JOB_DESC_TOKEN_BUDGET = int(os.getenv("PROMPT_JOB_DESC_TOKEN_BUDGET", "1200"))
+
+_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+_HYPHEN_SPLIT_RE = re.compile(r"(\w)-\n(\w)")
+_SPACES_RE = re.compile(r"[ \t ]+")
+_PAGE_MARKER_RE = re.compile(r"^(page\s*)?\d+\s*(of|/)\s*\d+$|^page\s+\d+$|^-\s*\d+\s*-$", re.I)
+
+# Job-description paragraphs that carry no signal for matching a resume.
+_BOILERPLATE_RE = re.compile(
+    r"equal\s+(employment\s+)?opportunity|without\s+regard\s+to|regardless\s+of\s+(race|gender|age)"
+    r"|reasonable\s+accommodation|protected\s+veteran|e-?verify|background\s+check"
+    r"|401\s*\(?k\)?|paid\s+time\s+off|\bpto\b|health,?\s+dental|parental\s+leave|wellness\s+program"
+    r"|apply\s+(now|today)|click\s+apply|privacy\s+(policy|notice)|cookie",
+    re.I,
+)
+_SKIP_HEADING_RE = re.compile(
+    r"^\W*(about\s+(us|the\s+company|the\s+team|[A-Z][\w&.\- ]{0,30})|who\s+we\s+are|our\s+(story|mission|values|culture)"
+    r"|benefits|perks(\s+and\s+benefits)?|what\s+we\s+offer|why\s+(join\s+us|work\s+(here|with\s+us))"
+    r"|eeo(\s+statement)?|equal\s+opportunity(\s+employer)?|how\s+to\s+apply|compensation(\s+and\s+benefits)?)\W*$",
+    re.I,
+)
+_KEEP_HEADING_RE = re.compile(
+    r"^\W*(responsibilities|requirements|qualifications|what\s+you('ll|\s+will)\s+do|what\s+you\s+bring"
+    r"|what\s+we('re|\s+are)\s+looking\s+for|skills|must\s+have|nice\s+to\s+have|preferred|the\s+role"
+    r"|role\s+overview|job\s+description|duties|about\s+the\s+role|about\s+you|you\s+have|you\s+are)\W*$",
+    re.I,
+)
+
+
+def estimate_tokens(text):
+    """Rough BPE token count: one per punctuation mark, one per four characters of each word."""
+    return sum(math.ceil(len(piece) / 4) for piece in _PIECE_RE.findall(text or ""))
+
+
+def normalize_whitespace(text):
+    text = (text or "").replace("\r\n", "\n").replace("\r", "\n")
+    text = _HYPHEN_SPLIT_RE.sub(r"\1\2", text)
+    lines = [_SPACES_RE.sub(" ", line).strip() for line in text.split("\n")]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def _header_like(line):
+    # Short repeats such as a job title used twice are real content; long lines and
+    # contact lines repeated verbatim are running headers/footers or copy-paste noise.
+    return len(line.split()) >= 4 or "@" in line or "http" in line or "www." in line
+
+
+def dedupe_lines(text):
+    """Drop page markers and verbatim repeats of header-like lines."""
+    seen = set()
+    kept = []
+    for line in text.split("\n"):
+        if line and _PAGE_MARKER_RE.match(line):
+            continue
+        if line and _header_like(line):
+            key = line.casefold()
+            if key in seen:
+                continue
+            seen.add(key)
+        kept.append(line)
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(kept)).strip()
+
+
+def strip_boilerplate(text):
+    """Remove company-marketing, benefits and EEO sections and lines from a job description."""
+    kept = []
+    skipping = False
+    for line in text.split("\n"):
+        short = len(line.split()) <= 6
+        if short and _KEEP_HEADING_RE.match(line):
+            skipping = False
+        elif short and _SKIP_HEADING_RE.match(line):
+            skipping = True
+            continue
+        if skipping or _BOILERPLATE_RE.search(line):
+            continue
+        kept.append(line)
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(kept)).strip()
+
+
+def truncate_to_tokens(text, budget):
+    """Keep whole lines from the top until the estimated token budget is reached."""
+    if estimate_tokens(text) <= budget:
+        return text
+    kept = []
+    used = 0
+    for line in text.split("\n"):
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept).rstrip() + "\n[...truncated]"
+
+
+def compact_resume(text, budget=RESUME_TOKEN_BUDGET):
+    return truncate_to_tokens(dedupe_lines(normalize_whitespace(text)), budget)
+
+
+def clean_job_description(text):
+    """Job description without extraction noise, repeated lines or boilerplate sections."""
+    return strip_boilerplate(dedupe_lines(normalize_whitespace(text)))
+
+
+def compact_job_description(text, budget=JOB_DESC_TOKEN_BUDGET):
+    """Prompt form of a job description, computed once per posting and kept in the JD store."""
+    if not text:
+        return text
+    return get_jd_store().derive(text, ("compact", budget), lambda: truncate_to_tokens(clean_job_description(text), budget))
+
+
+@dataclass
+class CompactedInputs:
+    resume: str
+    job_desc: str | None
+    stats: dict = field(default_factory=dict)
+
+
+def compact_inputs(resume_text, job_desc=None):
+    """Compact both prompt inputs and report estimated token counts before and after."""
+    resume = compact_resume(resume_text)
+    compact_jd = compact_job_description(job_desc) if job_desc else None
+    stats = {
+        "resume_before": estimate_tokens(resume_text),
+        "resume_after": estimate_tokens(resume),
+        "job_description_before": estimate_tokens(job_desc),
+        "job_description_after": estimate_tokens(compact_jd),
+    }
+    stats["before"] = stats["resume_before"] + stats["job_description_before"]
+    stats["after"] = stats["resume_after"] + stats["job_description_after"]
+    return CompactedInputs(resume, compact_jd, stats)
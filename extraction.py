@@ -0,0 +1,200 @@
+"""PDF text extraction on a warm process pool with per-document budgets."""
+import io
+import mmap
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass
+
+import PyPDF2
+
+from cache import get_text_cache, upload_digest
+
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+EXTRACT_PAGES_PER_TASK = int(os.getenv("EXTRACT_PAGES_PER_TASK", "8"))
+EXTRACT_MAX_PAGES = int(os.getenv("EXTRACT_MAX_PAGES", "50"))
+EXTRACT_TIMEOUT = float(os.getenv("EXTRACT_TIMEOUT", "10"))
+
+
+@dataclass
+class ExtractionResult:
+    text: str
+    truncated: bool = False
+    pages_total: int | None = None
+    pages_extracted: int | None = None
+    cached: bool = False
+
+    def meta(self):
+        return {
+            "truncated": self.truncated,
+            "pages_total": self.pages_total,
+            "pages_extracted": self.pages_extracted,
+            "cached": self.cached,
+        }
+
+
+def normalize_extracted_text(text):
+    """Drop NULs, unify newlines, strip trailing spaces and squeeze runs of blank lines."""
+    text = text.replace("\x00", "").replace("\r\n", "\n").replace("\r", "\n")
+    text = re.sub(r"[ \t]+\n", "\n", text)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def extract_cached(stream, kind, extract):
+    """Return the cached extraction for identical upload bytes, or run ``extract()`` and cache it.
+
+    Truncated results are not cached since a later attempt may get further.
+    """
+    text_cache = get_text_cache()
+    key = f"{kind}:{upload_digest(stream)}"
+    cached = text_cache.get(key)
+    if cached is not None:
+        return ExtractionResult(**dict(cached, cached=True))
+    result = extract()
+    result.text = normalize_extracted_text(result.text)
+    if not result.truncated:
+        text_cache.set(key, asdict(result))
+    return result
+
+
+def _noop():
+    return None
+
+
+def _read_pdf(source, work):
+    """Run ``work(reader)`` on a PDF given as bytes or as a path that is mapped, not read."""
+    if isinstance(source, (bytes, bytearray)):
+        return work(PyPDF2.PdfReader(io.BytesIO(source)))
+    with open(source, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        return work(PyPDF2.PdfReader(mapped))
+
+
+def _count_pages(source):
+    return _read_pdf(source, lambda reader: len(reader.pages))
+
+
+def _extract_page_range(source, start, stop):
+    return _read_pdf(source, lambda reader: [reader.pages[i].extract_text() or "" for i in range(start, stop)])
+
+
+class ExtractionService:
+    """Splits PDFs into page ranges across worker processes.
+
+    Each document gets a wall-clock budget and a page budget. When either is
+    exceeded the text of the page ranges that did finish is returned with
+    ``truncated=True``. Workers stuck on a hostile PDF are terminated by
+    recycling the pool, so one bad upload cannot pin a CPU indefinitely.
+    """
+
+    def __init__(self, workers=EXTRACT_WORKERS, pages_per_task=EXTRACT_PAGES_PER_TASK,
+                 max_pages=EXTRACT_MAX_PAGES, timeout=EXTRACT_TIMEOUT):
+        self.workers = workers
+        self.pages_per_task = pages_per_task
+        self.max_pages = max_pages
+        self.timeout = timeout
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def warm(self):
+        """Start every worker process now instead of on the first upload."""
+        pool = self._get_pool()
+        for future in [pool.submit(_noop) for _ in range(self.workers)]:
+            future.result()
+
+    def _recycle(self, pool):
+        with self._lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+        # ProcessPoolExecutor cannot cancel a running task; kill its workers instead.
+        for process in list(getattr(pool, "_processes", {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def extract_pdf(self, source):
+        """Extract text from PDF bytes or from a path; paths avoid copying the upload to workers.
+
+        A pool broken by a dead worker (OOM kill, a crash on a hostile PDF) is replaced
+        and the document retried once. If it breaks the pool again, it is given up as
+        truncated so later uploads still get a working pool.
+        """
+        deadline = time.monotonic() + self.timeout
+        for _ in range(2):
+            pool = self._get_pool()
+            try:
+                return self._extract_pdf(pool, source, deadline)
+            except BrokenProcessPool:
+                self._recycle(pool)
+        return ExtractionResult("", truncated=True, pages_extracted=0)
+
+    def _extract_pdf(self, pool, source, deadline):
+        try:
+            pages_total = pool.submit(_count_pages, source).result(timeout=max(0, deadline - time.monotonic()))
+        except FutureTimeout:
+            self._recycle(pool)
+            return ExtractionResult("", truncated=True, pages_extracted=0)
+
+        pages = min(pages_total, self.max_pages)
+        futures = [
+            pool.submit(_extract_page_range, source, start, min(start + self.pages_per_task, pages))
+            for start in range(0, pages, self.pages_per_task)
+        ]
+        chunks = []
+        truncated = pages_total > pages
+        for future in futures:
+            try:
+                chunks.append(future.result(timeout=max(0, deadline - time.monotonic())))
+            except FutureTimeout:
+                truncated = True
+                break
+        if len(chunks) < len(futures):
+            for future in futures[len(chunks):]:
+                future.cancel()
+            if any(future.running() for future in futures):
+                self._recycle(pool)
+
+        texts = [text for chunk in chunks for text in chunk]
+        return ExtractionResult(
+            "\n".join(texts),
+            truncated=truncated,
+            pages_total=pages_total,
+            pages_extracted=len(texts),
+        )
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_extraction_service():
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = ExtractionService()
+            _service.warm()
+        return _service
+
+
+def _reset_after_fork():
+    # A pool inherited from the parent (e.g. gunicorn --preload) is unusable in the child.
+    global _service, _service_lock
+    _service = None
+    _service_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
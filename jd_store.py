@@ -0,0 +1,169 @@
+"""Preprocessed job descriptions, shared by every request that uses the same posting.
+
+Popular postings are pasted again and again. Each distinct description, keyed by a
+BLAKE2 hash of its exact text, gets one entry holding what was derived from it. That is
+the compact prompt form (compaction.compact_job_description) and the matching profile
+(scoring.job_profile), each computed on first use. Both depend on the line layout, so
+descriptions that differ only in whitespace get entries of their own. Entries are
+evicted least recently used first, by count and by the size of the text plus what was
+derived from it. Lookup counters show which postings are popular; ``top()`` lists them,
+and with their text in the format ``load_postings`` reads, so a deployment can warm a
+fresh process with yesterday's most used postings.
+"""
+import dataclasses
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def jd_digest(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def approx_size(value):
+    """Rough size of a derived value: string lengths, plus 8 for every other scalar."""
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(approx_size(k) + approx_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sum(approx_size(item) for item in value)
+    if dataclasses.is_dataclass(value):
+        return sum(approx_size(getattr(value, f.name)) for f in dataclasses.fields(value))
+    return 8
+
+
+class JobDescriptionEntry:
+    __slots__ = ("digest", "text", "derived", "size", "lookups", "created_at", "last_used")
+
+    def __init__(self, digest, text, now):
+        self.digest = digest
+        self.text = text
+        self.derived = {}
+        self.size = len(text)
+        self.lookups = 0
+        self.created_at = now
+        self.last_used = now
+
+
+class JobDescriptionStore:
+    """LRU store of job descriptions and the values derived from them, with lookup counters."""
+
+    def __init__(self, max_entries=1024, max_bytes=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def derive(self, text, name, compute):
+        """The value ``name`` for this description: ``compute()``'s result, computed once.
+
+        Values must be treated as read-only; every caller with the same posting gets the
+        same object.
+        """
+        digest = jd_digest(text)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                entry = JobDescriptionEntry(digest, text, now)
+                self._entries[digest] = entry
+                self._bytes += entry.size
+            self._entries.move_to_end(digest)
+            entry.lookups += 1
+            entry.last_used = now
+            if name in entry.derived:
+                self.hits += 1
+                return entry.derived[name]
+            self.misses += 1
+        # Computed outside the lock; two first requests for a posting may both compute it.
+        value = compute()
+        size = approx_size(value)
+        with self._lock:
+            if name in entry.derived:
+                return entry.derived[name]
+            entry.derived[name] = value
+            entry.size += size
+            # An entry evicted while computing no longer counts toward the budget.
+            if self._entries.get(digest) is entry:
+                self._bytes += size
+                self._evict()
+        return value
+
+    def _evict(self):
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+
+    def warm(self, texts, *preprocessors):
+        """Run each ``preprocessor(text)`` for every posting; its lookups are not counted as use."""
+        for text in texts:
+            for preprocess in preprocessors:
+                preprocess(text)
+            with self._lock:
+                entry = self._entries.get(jd_digest(text))
+                if entry is not None:
+                    entry.lookups = 0
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def top(self, limit=20, with_text=False):
+        """Most looked-up postings first, as {"digest", "length", "lookups", "last_used"}.
+
+        ``with_text`` adds each posting's "text", which is what users pasted.
+        """
+        with self._lock:
+            entries = sorted(self._entries.values(), key=lambda e: (-e.lookups, -e.last_used))[:limit]
+            top = [{"digest": e.digest, "length": len(e.text), "lookups": e.lookups, "last_used": e.last_used}
+                   for e in entries]
+            if with_text:
+                for item, e in zip(top, entries):
+                    item["text"] = e.text
+            return top
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+def load_postings(path):
+    """Texts from a JSON list of strings or {"text": ...} objects, e.g. saved from ``top()``."""
+    with open(path, encoding="utf-8") as f:
+        items = json.load(f)
+    return [item["text"] if isinstance(item, dict) else item for item in items
+            if (item.get("text") if isinstance(item, dict) else item)]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_jd_store():
+    """Process-wide store configured from JD_STORE_* environment variables."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = JobDescriptionStore(
+                max_entries=int(os.getenv("JD_STORE_MAX_ENTRIES", "1024")),
+                max_bytes=int(os.getenv("JD_STORE_MAX_BYTES", str(32 * 1024 * 1024))),
+            )
+        return _store
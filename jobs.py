@@ -0,0 +1,381 @@
+"""Background analysis jobs: a leased queue, worker threads and webhook delivery.
+
+A job is claimed with a lease (visibility timeout). If the worker holding it dies,
+the lease runs out and another worker picks the job up again. Failed attempts are
+retried with exponential backoff until ``max_attempts`` is reached.
+
+Use the SQLite backend when several processes (e.g. gunicorn workers) serve the
+API, so that any of them can answer ``GET /api/jobs/<id>``.
+"""
+import ipaddress
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from urllib.parse import urlparse
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+def _new_job(payload, callback_url, now):
+    return {
+        "id": uuid.uuid4().hex,
+        "status": QUEUED,
+        "payload": payload,
+        "callback_url": callback_url,
+        "attempts": 0,
+        "available_at": now,
+        "lease_until": None,
+        "lease_token": None,
+        "result": None,
+        "error": None,
+        "webhook": None,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+class MemoryJobBackend:
+    """Jobs in a dict; only visible to the process that created them."""
+
+    name = "memory"
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def add(self, job):
+        with self._lock:
+            self._jobs[job["id"]] = job
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def claim(self, now, lease_seconds):
+        with self._lock:
+            ready = [
+                job for job in self._jobs.values()
+                if (job["status"] == QUEUED and job["available_at"] <= now)
+                or (job["status"] == RUNNING and job["lease_until"] <= now)
+            ]
+            if not ready:
+                return None
+            job = min(ready, key=lambda j: j["created_at"])
+            job.update(status=RUNNING, lease_until=now + lease_seconds, lease_token=uuid.uuid4().hex,
+                       attempts=job["attempts"] + 1, updated_at=now)
+            return dict(job)
+
+    def update(self, job_id, lease_token, **fields):
+        """Apply ``fields`` if the caller still holds the lease (or lease_token is None)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or (lease_token is not None and job["lease_token"] != lease_token):
+                return False
+            job.update(fields)
+            return True
+
+    def purge(self, before):
+        with self._lock:
+            for job_id in [j["id"] for j in self._jobs.values()
+                           if j["status"] in (SUCCEEDED, FAILED) and j["updated_at"] < before]:
+                del self._jobs[job_id]
+
+    def counts(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            return counts
+
+
+class SQLiteJobBackend:
+    """Jobs in SQLite, shared between processes on the same host."""
+
+    name = "sqlite"
+    _JSON_FIELDS = ("payload", "result")
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, payload TEXT NOT NULL, callback_url TEXT, "
+            "attempts INTEGER NOT NULL, available_at REAL NOT NULL, lease_until REAL, lease_token TEXT, "
+            "result TEXT, error TEXT, webhook TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs(status, available_at)")
+        self._lock = threading.Lock()
+
+    def _row(self, row):
+        if row is None:
+            return None
+        job = dict(row)
+        for field in self._JSON_FIELDS:
+            if job[field] is not None:
+                job[field] = json.loads(job[field])
+        return job
+
+    def add(self, job):
+        row = dict(job, payload=json.dumps(job["payload"]), result=None)
+        columns = ", ".join(row)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT INTO jobs ({columns}) VALUES ({', '.join('?' * len(row))})", tuple(row.values())
+            )
+
+    def get(self, job_id):
+        with self._lock:
+            return self._row(self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def claim(self, now, lease_seconds):
+        # One statement, so two processes can never claim the same job.
+        with self._lock:
+            row = self._conn.execute(
+                "UPDATE jobs SET status = ?, lease_until = ?, lease_token = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE id = (SELECT id FROM jobs WHERE (status = ? AND available_at <= ?) "
+                "OR (status = ? AND lease_until <= ?) ORDER BY created_at LIMIT 1) RETURNING *",
+                (RUNNING, now + lease_seconds, uuid.uuid4().hex, now, QUEUED, now, RUNNING, now),
+            ).fetchone()
+            return self._row(row)
+
+    def update(self, job_id, lease_token, **fields):
+        for field in self._JSON_FIELDS:
+            if fields.get(field) is not None:
+                fields[field] = json.dumps(fields[field])
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        query = f"UPDATE jobs SET {assignments} WHERE id = ?"
+        params = list(fields.values()) + [job_id]
+        if lease_token is not None:
+            query += " AND lease_token = ?"
+            params.append(lease_token)
+        with self._lock:
+            return self._conn.execute(query, params).rowcount == 1
+
+    def purge(self, before):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?", (SUCCEEDED, FAILED, before)
+            )
+
+    def counts(self):
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+
+def non_public_address(hostname):
+    """The first address ``hostname`` resolves to that is not globally routable, or None.
+
+    Raises ValueError when the name does not resolve.
+    """
+    try:
+        infos = socket.getaddrinfo(hostname, None, proto=socket.IPPROTO_TCP)
+    except OSError as e:
+        raise ValueError(f"callback_url host {hostname} does not resolve: {e}") from None
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%", 1)[0])
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not address.is_global:
+            return address
+    return None
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # A redirect would bypass the callback_url host checks.
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+_webhook_opener = urllib.request.build_opener(_NoRedirect)
+
+
+def deliver_webhook(url, body, attempts=3, timeout=10):
+    """POST ``body`` as JSON to ``url``; returns "delivered" or the last error. Redirects are not followed."""
+    data = json.dumps(body).encode("utf-8")
+    error = None
+    for attempt in range(attempts):
+        request = urllib.request.Request(url, data=data, method="POST", headers={"Content-Type": "application/json"})
+        try:
+            with _webhook_opener.open(request, timeout=timeout) as response:
+                if response.status < 300:
+                    return "delivered"
+                error = f"HTTP {response.status}"
+        except (urllib.error.URLError, OSError) as e:
+            error = str(e)
+        if attempt + 1 < attempts:
+            time.sleep(min(2 ** attempt, 10))
+    return f"failed: {error}"
+
+
+class JobQueue:
+    """Enqueue jobs and drain them with ``workers`` threads running ``handler(payload)``.
+
+    ``webhook_hosts`` are the hosts a ``callback_url`` may point at; "*" allows any host
+    whose addresses are all public. Without any, callbacks are refused.
+    """
+
+    def __init__(self, backend, workers=4, max_attempts=3, visibility_timeout=300,
+                 retry_delay=5.0, result_ttl=86400, webhook_hosts=()):
+        self.backend = backend
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.visibility_timeout = visibility_timeout
+        self.retry_delay = retry_delay
+        self.result_ttl = result_ttl
+        self.webhook_hosts = frozenset(webhook_hosts or ())
+        self._handler = None
+        self._threads = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def check_callback_url(self, url):
+        """Raise ValueError unless ``url`` is an http(s) URL on an allowed host.
+
+        Under "*" the host is resolved, and loopback, private, link-local and other
+        non-public addresses are refused. Checked again before each delivery, since the
+        name may resolve elsewhere by then.
+        """
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https") or not parsed.hostname:
+            raise ValueError("callback_url must be an http(s) URL")
+        if not self.webhook_hosts:
+            raise ValueError("callback_url is not enabled on this server")
+        if parsed.hostname in self.webhook_hosts:
+            return
+        if "*" not in self.webhook_hosts:
+            raise ValueError(f"callback_url host {parsed.hostname} is not allowed")
+        address = non_public_address(parsed.hostname)
+        if address is not None:
+            raise ValueError(f"callback_url host {parsed.hostname} resolves to non-public address {address}")
+
+    def enqueue(self, payload, callback_url=None):
+        if callback_url:
+            self.check_callback_url(callback_url)
+        now = time.time()
+        job = _new_job(payload, callback_url, now)
+        self.backend.add(job)
+        self.backend.purge(now - self.result_ttl)
+        self._wake.set()
+        return job["id"]
+
+    def get(self, job_id):
+        job = self.backend.get(job_id)
+        if job is None:
+            return None
+        view = {key: job[key] for key in ("id", "status", "attempts", "error", "webhook", "created_at", "updated_at")}
+        if job["status"] == SUCCEEDED:
+            view["result"] = job["result"]
+        return view
+
+    def start(self, handler):
+        """Start the worker threads once per process."""
+        with self._lock:
+            self._handler = handler
+            if self._threads and all(t.is_alive() for t in self._threads):
+                return
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            job = self.backend.claim(time.time(), self.visibility_timeout)
+            if job is None:
+                # Wake on enqueue in this process; poll for jobs added by other processes.
+                self._wake.wait(1.0)
+                self._wake.clear()
+                continue
+            self.run_job(job)
+
+    def run_job(self, job):
+        try:
+            result = self._handler(job["payload"])
+        except Exception as e:
+            now = time.time()
+            if job["attempts"] < self.max_attempts:
+                delay = self.retry_delay * 2 ** (job["attempts"] - 1)
+                self.backend.update(job["id"], job["lease_token"], status=QUEUED, error=str(e),
+                                    available_at=now + delay, lease_until=None, updated_at=now)
+                return
+            self.backend.update(job["id"], job["lease_token"], status=FAILED, error=str(e),
+                                lease_until=None, updated_at=now)
+            self._notify(job, {"id": job["id"], "status": FAILED, "error": str(e)})
+            return
+        if self.backend.update(job["id"], job["lease_token"], status=SUCCEEDED, result=result,
+                               error=None, lease_until=None, updated_at=time.time()):
+            self._notify(job, {"id": job["id"], "status": SUCCEEDED, "result": result})
+
+    def _notify(self, job, body):
+        if job.get("callback_url"):
+            try:
+                self.check_callback_url(job["callback_url"])
+            except ValueError as e:
+                outcome = f"failed: {e}"
+            else:
+                outcome = deliver_webhook(job["callback_url"], body)
+            self.backend.update(job["id"], None, webhook=outcome)
+
+    def stats(self):
+        return {
+            "backend": self.backend.name,
+            "workers": self.workers,
+            "running_threads": sum(1 for t in self._threads if t.is_alive()),
+            "jobs": self.backend.counts(),
+        }
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Process-wide job queue configured from JOB_* environment variables."""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            if os.getenv("JOB_QUEUE_BACKEND", "memory").lower() == "sqlite":
+                backend = SQLiteJobBackend(os.getenv("JOB_QUEUE_PATH", "jobs.sqlite3"))
+            else:
+                backend = MemoryJobBackend()
+            hosts = os.getenv("JOB_WEBHOOK_ALLOWED_HOSTS", "")
+            _job_queue = JobQueue(
+                backend,
+                workers=int(os.getenv("JOB_WORKERS", "4")),
+                max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "3")),
+                visibility_timeout=float(os.getenv("JOB_VISIBILITY_TIMEOUT", "300")),
+                result_ttl=float(os.getenv("JOB_RESULT_TTL", "86400")),
+                webhook_hosts={h.strip().lower() for h in hosts.split(",") if h.strip()},
+            )
+        return _job_queue
+
+
+def _reset_after_fork():
+    # Worker threads do not survive fork; the child builds its own queue on first use.
+    global _job_queue, _job_queue_lock
+    _job_queue = None
+    _job_queue_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
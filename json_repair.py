@@ -0,0 +1,343 @@
+"""Tolerant parsing of model output that is meant to be a single JSON object.
+
+``JSONRepairer`` makes one pass over the text, fed whole (``repair_json``) or chunk by
+chunk as a streamed answer arrives, and fixes the defects models actually produce:
+
+- Markdown fences and chatter around the object.
+- Trailing and missing commas.
+- Unquoted keys and single-quoted strings.
+- Raw newlines inside strings.
+- Python literals, and ``true/false`` placeholders copied from a schema example.
+- Output cut off at ``max_tokens``. The object is closed at the last complete value,
+  and a half-written string value is kept.
+
+``complete`` then checks the result against an example-shaped template and fills
+in whatever is missing.
+"""
+import json
+import re
+
+_WORD_RE = re.compile(r"[A-Za-z0-9_+\-.$/]+")
+_NUMBER_RE = re.compile(r"-?(0|[1-9]\d*)(\.\d+)?([eE][+-]?\d+)?$")
+_FENCE_RE = re.compile(r"```(?:json)?\s*([\s\S]*?)(?:```|$)")
+_LITERALS = {
+    "true": "true", "false": "false", "null": "null",
+    "True": "true", "False": "false", "None": "null",
+}
+_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+_VALID_ESCAPES = set('"\\/bfnrtu')
+
+
+def _read_string(text, i, quote):
+    """Read a string starting after its opening quote. Returns (JSON body, next index, closed)."""
+    parts = []
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if ch == "\\" and i + 1 < n:
+            nxt = text[i + 1]
+            if nxt in _VALID_ESCAPES:
+                parts.append(ch + nxt)
+            else:
+                # \' and other non-JSON escapes keep their character and lose the backslash.
+                parts.append(nxt)
+            i += 2
+            continue
+        if ch == quote:
+            return "".join(parts), i + 1, True
+        if ch == '"':
+            parts.append('\\"')
+        elif ch in _ESCAPES:
+            parts.append(_ESCAPES[ch])
+        elif ch == "\\":
+            i += 1
+            continue
+        else:
+            parts.append(ch)
+        i += 1
+    return "".join(parts), i, False
+
+
+class JSONRepairer:
+    """Incremental ``repair_json``: ``feed`` chunks as they arrive, then ``finish``.
+
+    Each chunk is consumed as far as it forms complete tokens; a string, word or
+    comment cut by the chunk boundary waits for the next chunk. Repairing a streamed
+    answer therefore costs one pass spread over the stream, and ``snapshot`` gives
+    valid JSON of everything complete so far at any point.
+    """
+
+    def __init__(self):
+        self.repairs = []
+        self._text = ""
+        self._started = False
+        self._fenced = False
+        self._out = []
+        self._stack = []
+        # Per open container: "key", "colon", "value" or "comma" (a value was just completed).
+        self._state = "value"
+        # Output length and open containers at the last point where closing them yields valid JSON.
+        self._safe = (0, ())
+        # The top-level value is closed, or parsing stopped at something it cannot use.
+        self._complete = False
+        self._stopped = False
+        self._result = None
+
+    def feed(self, chunk):
+        if chunk and self._result is None and not (self._complete or self._stopped):
+            self._text += chunk
+            self._run(final=False)
+
+    def finish(self):
+        """Close whatever is still open. Returns (json_text or None, repairs), like ``repair_json``."""
+        if self._result is None:
+            self._run(final=True)
+            if not self._started:
+                self._result = (None, self.repairs)
+                return self._result
+            out = self._out
+            if not self._complete:
+                self._note("truncated")
+                length, saved = self._safe
+                del out[length:]
+                if out and out[-1] == ",":
+                    out.pop()
+                out.extend("}" if c == "{" else "]" for c in reversed(saved))
+            self._result = ("".join(out), self.repairs)
+        return self._result
+
+    def parse(self):
+        """``finish`` and load the result. Returns (value or None, repairs), like ``parse_json``."""
+        repaired, repairs = self.finish()
+        if repaired is None:
+            return None, repairs
+        try:
+            return json.loads(repaired), repairs
+        except ValueError:
+            return None, repairs
+
+    def snapshot(self):
+        """Valid JSON of the values completed so far, or None before the opening bracket."""
+        if not self._started:
+            return None
+        if self._complete:
+            return "".join(self._out)
+        length, saved = self._safe
+        out = self._out[:length]
+        if out and out[-1] == ",":
+            out.pop()
+        return "".join(out) + "".join("}" if c == "{" else "]" for c in reversed(saved))
+
+    def _note(self, repair):
+        if repair not in self.repairs:
+            self.repairs.append(repair)
+
+    def _value_done(self):
+        if not self._stack:
+            self._complete = True
+            return
+        self._state = "comma"
+        self._safe = (len(self._out), tuple(self._stack))
+
+    def _before_value(self):
+        # Called when a key or value starts where a comma or colon was due.
+        if self._state == "comma":
+            self._out.append(",")
+            self._note("missing_comma")
+            self._state = "key" if self._stack[-1] == "{" else "value"
+        elif self._state == "colon":
+            self._out.append(":")
+            self._note("missing_colon")
+            self._state = "value"
+
+    def _run(self, final):
+        text = self._text
+        if not self._started:
+            fence = _FENCE_RE.search(text)
+            if fence and "{" in fence.group(1):
+                # Parse the fenced block; a closing fence then ends the input.
+                self._fenced = True
+                text = text[fence.start(1):]
+            starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+            if not starts:
+                return
+            self._started = True
+            text = text[min(starts):]
+        out = self._out
+        stack = self._stack
+        note = self._note
+        i = 0
+        n = len(text)
+
+        while i < n and not (self._complete or self._stopped):
+            ch = text[i]
+            state = self._state
+            if ch.isspace():
+                i += 1
+            elif ch in "{[":
+                if stack and stack[-1] == "{" and state in ("key", "comma"):
+                    self._stopped = True
+                    break
+                self._before_value()
+                out.append(ch)
+                stack.append(ch)
+                self._state = "key" if ch == "{" else "value"
+                self._safe = (len(out), tuple(stack))
+                i += 1
+            elif ch in "}]":
+                if not stack:
+                    self._stopped = True
+                    break
+                if state in ("colon", "value") and stack[-1] == "{" and out[-1] != "{":
+                    # Key without a value: drop it, and the comma before it.
+                    del out[self._safe[0]:]
+                    note("dangling_key")
+                if out[-1] == ",":
+                    out.pop()
+                    note("trailing_comma")
+                out.append("}" if stack.pop() == "{" else "]")
+                if ch != out[-1]:
+                    note("mismatched_bracket")
+                i += 1
+                self._value_done()
+            elif ch == ",":
+                if state == "comma":
+                    out.append(",")
+                    self._state = "key" if stack[-1] == "{" else "value"
+                i += 1
+            elif ch == ":":
+                if state == "colon":
+                    out.append(":")
+                    self._state = "value"
+                i += 1
+            elif ch in "\"'":
+                body, end, closed = _read_string(text, i + 1, ch)
+                if not closed and not final:
+                    break
+                i = end
+                if ch == "'":
+                    note("single_quotes")
+                if stack[-1] == "{" and state in ("key", "comma"):
+                    if not closed:
+                        self._stopped = True
+                        break
+                    self._before_value()
+                    out.append(f'"{body}"')
+                    self._state = "colon"
+                elif state in ("value", "comma", "colon"):
+                    self._before_value()
+                    out.append(f'"{body}"')
+                    if not closed:
+                        note("truncated")
+                    self._value_done()
+            elif ch == "`" and self._fenced and (text.startswith("```", i) or (not final and n - i < 3)):
+                if not final and n - i < 3:
+                    break
+                self._stopped = True
+            elif ch == "/" and (text.startswith(("//", "/*"), i) or (not final and i + 1 == n)):
+                if i + 1 == n:
+                    break
+                line = text[i + 1] == "/"
+                end = text.find("\n" if line else "*/", i)
+                if end < 0 and not final:
+                    break
+                i = n if end < 0 else end + (1 if line else 2)
+                note("comment")
+            else:
+                match = _WORD_RE.match(text, i)
+                if not match:
+                    note("stray_text")
+                    i += 1
+                    continue
+                if match.end() >= n:
+                    # A bare word running into the end of the text may itself be cut short.
+                    if final:
+                        self._stopped = True
+                    break
+                word = match.group()
+                i = match.end()
+                if stack[-1] == "{" and state in ("key", "comma"):
+                    self._before_value()
+                    out.append(json.dumps(word))
+                    note("unquoted_key")
+                    self._state = "colon"
+                elif state in ("value", "comma", "colon"):
+                    self._before_value()
+                    if word in _LITERALS:
+                        if word != _LITERALS[word]:
+                            note("python_literal")
+                        out.append(_LITERALS[word])
+                    elif _NUMBER_RE.match(word):
+                        out.append(word)
+                    elif "/" in word and set(word.split("/")) <= {"true", "false"}:
+                        out.append("null")
+                        note("placeholder")
+                    else:
+                        out.append(json.dumps(word))
+                        note("unquoted_value")
+                    self._value_done()
+        # Keep only the unconsumed tail; the next chunk continues from there.
+        self._text = text[i:]
+
+
+def repair_json(text):
+    """Rewrite ``text`` into valid JSON. Returns (json_text or None, list of repairs made)."""
+    repairer = JSONRepairer()
+    repairer.feed(text or "")
+    return repairer.finish()
+
+
+def parse_json(text):
+    """Parse model output leniently. Returns (value or None, list of repairs made)."""
+    try:
+        return json.loads(text), []
+    except (TypeError, ValueError):
+        pass
+    repaired, repairs = repair_json(text)
+    if repaired is None:
+        return None, repairs
+    try:
+        return json.loads(repaired), repairs
+    except ValueError:
+        return None, repairs
+
+
+def _empty_like(example):
+    if isinstance(example, dict):
+        return {key: _empty_like(value) for key, value in example.items()}
+    if isinstance(example, list):
+        return []
+    if isinstance(example, str):
+        return ""
+    return None
+
+
+def complete(data, template, optional=(), path=""):
+    """Fill in keys of ``template`` that ``data`` lacks. Returns (data, dotted paths that were missing).
+
+    ``template`` is an example object: its values only give the expected type.
+    Dotted paths in ``optional`` may be null. Numbers that came back as numeric
+    strings are converted.
+    """
+    missing = []
+    result = dict(data)
+    for key, example in template.items():
+        where = f"{path}{key}"
+        value = result.get(key)
+        if value is None and where in optional:
+            result[key] = None
+        elif value is None or (isinstance(example, dict) and not isinstance(value, dict)):
+            result[key] = _empty_like(example)
+            missing.append(where)
+        elif isinstance(example, dict):
+            result[key], nested = complete(value, example, optional, where + ".")
+            missing.extend(nested)
+        elif isinstance(example, list) and not isinstance(value, list):
+            result[key] = [value] if isinstance(value, (str, dict)) else []
+        elif isinstance(example, (int, float)) and not isinstance(example, bool) and isinstance(value, str):
+            try:
+                result[key] = float(value.strip().rstrip("%")) if "." in value else int(value.strip().rstrip("%"))
+            except ValueError:
+                result[key] = None
+                missing.append(where)
+    return result, missing
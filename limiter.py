@@ -0,0 +1,95 @@
+"""Bounded concurrency for upstream LLM calls in the async (ASGI) app."""
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+
+class QueueFull(Exception):
+    """Raised when the wait queue is at its maximum depth."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Server busy, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """Caps in-flight calls and admits waiters strictly in arrival order.
+
+    A released slot is handed directly to the oldest waiter, so late arrivals
+    cannot overtake the queue. ``retry_after`` is estimated from the average
+    time a slot is held.
+    """
+
+    def __init__(self, max_inflight=32, max_queue=256, default_retry_after=5):
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.default_retry_after = default_retry_after
+        self._inflight = 0
+        self._waiters = deque()
+        self._avg_hold = None
+        self.rejected = 0
+
+    @property
+    def inflight(self):
+        return self._inflight
+
+    @property
+    def queued(self):
+        return len(self._waiters)
+
+    def retry_after(self):
+        if self._avg_hold is None:
+            return self.default_retry_after
+        waves = (len(self._waiters) + 1) / self.max_inflight
+        return max(1, math.ceil(waves * self._avg_hold))
+
+    async def acquire(self):
+        if self._inflight < self.max_inflight and not self._waiters:
+            self._inflight += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise QueueFull(self.retry_after())
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # The slot was handed to us just before cancellation; pass it on.
+                self.release()
+            elif fut in self._waiters:
+                self._waiters.remove(fut)
+            raise
+
+    def release(self):
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self._inflight -= 1
+
+    def _record_hold(self, seconds):
+        self._avg_hold = seconds if self._avg_hold is None else 0.8 * self._avg_hold + 0.2 * seconds
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._record_hold(time.monotonic() - started)
+            self.release()
+
+    def stats(self):
+        return {
+            "inflight": self._inflight,
+            "queued": len(self._waiters),
+            "max_inflight": self.max_inflight,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+        }
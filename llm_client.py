@@ -0,0 +1,148 @@
+"""Process-wide HTTP connection pool for OpenAI-compatible clients.
+
+Every OpenAI client built here shares one ``httpx.Client``, so TLS sessions and
+keep-alive connections are reused across requests, threads and Streamlit reruns.
+The pool is dropped in forked children (gunicorn workers) and rebuilt on first use.
+"""
+import importlib.util
+import os
+import threading
+
+import httpx
+from openai import OpenAI
+
+MAX_CONNECTIONS = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "20"))
+KEEPALIVE_EXPIRY = float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", "60"))
+# "auto" turns HTTP/2 on when the optional h2 package is installed (pip install httpx[http2]).
+HTTP2 = os.getenv("LLM_HTTP2", "auto").lower()
+
+
+def http2_enabled():
+    if HTTP2 == "auto":
+        return importlib.util.find_spec("h2") is not None
+    return HTTP2 in ("1", "true", "yes")
+
+
+class _CountingClient(httpx.Client):
+    """``httpx.Client`` that reports every send as started and finished, however it ends."""
+
+    def __init__(self, *args, on_start, on_finish, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._on_start = on_start
+        self._on_finish = on_finish
+
+    def send(self, request, **kwargs):
+        self._on_start()
+        try:
+            return super().send(request, **kwargs)
+        finally:
+            # Connect errors, timeouts and interrupted sends end here too, not only responses.
+            self._on_finish()
+
+
+class ClientPool:
+    """One pooled ``httpx.Client`` plus the OpenAI clients built on top of it."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._http = None
+        self._clients = {}
+        self._in_flight = 0
+        self.requests = 0
+        self.peak_in_flight = 0
+
+    def _on_start(self):
+        with self._lock:
+            self.requests += 1
+            self._in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self._in_flight)
+
+    def _on_finish(self):
+        # Runs once headers arrive; streamed bodies keep the connection busy a little longer.
+        with self._lock:
+            self._in_flight -= 1
+
+    def http_client(self):
+        with self._lock:
+            if self._http is None:
+                self._http = _CountingClient(
+                    http2=http2_enabled(),
+                    limits=httpx.Limits(
+                        max_connections=MAX_CONNECTIONS,
+                        max_keepalive_connections=MAX_KEEPALIVE,
+                        keepalive_expiry=KEEPALIVE_EXPIRY,
+                    ),
+                    on_start=self._on_start,
+                    on_finish=self._on_finish,
+                )
+            return self._http
+
+    def openai_client(self, api_key, base_url, timeout=60.0, max_retries=2):
+        key = (api_key, base_url, timeout, max_retries)
+        http = self.http_client()
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = OpenAI(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=max_retries,
+                                http_client=http)
+                self._clients[key] = client
+            return client
+
+    def reset(self):
+        """Forget the pool without closing it; used in forked children, whose sockets are shared with the parent."""
+        self._lock = threading.Lock()
+        self._http = None
+        self._clients = {}
+        self._in_flight = 0
+        self.requests = 0
+        self.peak_in_flight = 0
+
+    def close(self):
+        with self._lock:
+            if self._http is not None:
+                self._http.close()
+            self._http = None
+            self._clients = {}
+
+    def stats(self):
+        with self._lock:
+            http = self._http
+            stats = {
+                "http2": http2_enabled(),
+                "max_connections": MAX_CONNECTIONS,
+                "max_keepalive": MAX_KEEPALIVE,
+                "keepalive_expiry": KEEPALIVE_EXPIRY,
+                "clients": len(self._clients),
+                "requests": self.requests,
+                "in_flight": self._in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "connections": 0,
+                "idle_connections": 0,
+            }
+        # httpcore's pool is not public API; report what it exposes and skip it otherwise.
+        pool = getattr(getattr(http, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+        if connections:
+            stats["connections"] = len(connections)
+            stats["idle_connections"] = sum(1 for c in connections if c.is_idle())
+        stats["utilization"] = round(stats["in_flight"] / MAX_CONNECTIONS, 4) if MAX_CONNECTIONS else 0.0
+        return stats
+
+
+_pool = ClientPool()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_pool.reset)
+
+
+def get_openai_client(api_key, base_url, timeout=60.0, max_retries=2):
+    """Shared OpenAI client for ``base_url``; all of them reuse one connection pool.
+
+    ``max_retries`` is the SDK's own retry count; the router passes 0 and retries itself.
+    """
+    return _pool.openai_client(api_key, base_url, timeout, max_retries)
+
+
+def pool_stats():
+    return _pool.stats()
@@ -0,0 +1,317 @@
+"""Routing of chat completions across several OpenAI-compatible backends.
+
+Backends are configured with ``LLM_BACKENDS``, a JSON list such as::
+
+    [{"name": "groq", "base_url": "https://api.groq.com/openai/v1",
+      "model": "llama-3.3-70b-versatile", "api_key_env": "GROQ_API_KEY"},
+     {"name": "local", "base_url": "http://127.0.0.1:8001/v1", "model": "mock", "api_key": "test"}]
+
+Without it, a single Groq backend is built from ``GROQ_API_KEY``. Entries may set
+``rpm`` and ``tpm`` to admit calls against that backend's quota (see ratelimit.py);
+the default Groq backend reads ``LLM_RPM`` and ``LLM_TPM``.
+
+Each backend has a circuit breaker, and every call runs under the retry policy from
+resilience.py. The SDK's own retries are turned off so the two do not multiply.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import asdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import openai
+
+import metrics
+from compaction import estimate_tokens
+from llm_client import get_openai_client
+from ratelimit import AdmissionController, RateLimited, parse_duration
+from resilience import OPEN, CircuitBreaker, CircuitOpen, RetryBudget, RetryPolicy, call_with_retries, is_outage
+
+GROQ_BASE_URL = "https://api.groq.com/openai/v1"
+DEFAULT_MODEL = "llama-3.3-70b-versatile"
+# Completion tokens charged up front; corrected from response.usage afterwards.
+EXPECTED_COMPLETION_TOKENS = int(os.getenv("LLM_EXPECTED_COMPLETION_TOKENS", "1500"))
+
+
+class NoBackendAvailable(Exception):
+    pass
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+class Backend:
+    """One endpoint/model pair with a rolling window of latencies and a circuit breaker.
+
+    Streamed calls return once headers arrive, so their latency is time to first byte.
+    It is kept in a window of its own and never feeds the p50/p95 used for routing and
+    hedging, which describe complete answers.
+    """
+
+    def __init__(self, name, base_url, model, api_key, timeout=60.0, window=50,
+                 cooldown=30.0, max_error_rate=0.5, max_consecutive_failures=3, admission=None):
+        self.name = name
+        self.base_url = base_url
+        self.model = model
+        self.api_key = api_key
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(name, max_consecutive_failures, max_error_rate, window, reset_timeout=cooldown)
+        self._latencies = deque(maxlen=window)
+        self._stream_latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.admission = admission
+
+    @property
+    def client(self):
+        return get_openai_client(self.api_key, self.base_url, self.timeout, max_retries=0)
+
+    def record(self, latency, ok, stream=False):
+        if ok:
+            with self._lock:
+                (self._stream_latencies if stream else self._latencies).append(latency)
+        self.breaker.record(ok)
+
+    @property
+    def healthy(self):
+        return self.breaker.state != OPEN
+
+    def p50(self):
+        with self._lock:
+            return _percentile(self._latencies, 50)
+
+    def p95(self):
+        with self._lock:
+            return _percentile(self._latencies, 95)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "name": self.name,
+                "model": self.model,
+                "healthy": self.healthy,
+                "p50": _percentile(self._latencies, 50),
+                "p95": _percentile(self._latencies, 95),
+                "error_rate": round(self.breaker.error_rate(), 4),
+                "samples": len(self._latencies),
+                "stream_ttfb_p50": _percentile(self._stream_latencies, 50),
+                "stream_samples": len(self._stream_latencies),
+                "circuit": self.breaker.stats(),
+                "admission": self.admission.stats() if self.admission else None,
+            }
+
+
+def estimate_request_tokens(messages, params):
+    prompt = sum(estimate_tokens(m.get("content") or "") + 4 for m in messages)
+    return prompt + min(params.get("max_tokens") or EXPECTED_COMPLETION_TOKENS, EXPECTED_COMPLETION_TOKENS)
+
+
+class LLMRouter:
+    """Sends each request to the fastest healthy backend and fails over on errors.
+
+    With ``hedge`` enabled, a non-streaming request that has not finished after the
+    primary backend's p95 latency is duplicated to the next backend; the first
+    successful answer wins. Backends whose circuit is open are skipped; when all of
+    them are, ``create`` raises CircuitOpen at once.
+    """
+
+    def __init__(self, backends, hedge=False, hedge_delay=2.0, max_workers=32, max_wait=10.0,
+                 policy=None, budget=None):
+        self.backends = list(backends)
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.max_wait = max_wait
+        self.policy = policy or RetryPolicy()
+        self.budget = budget or RetryBudget()
+        # Any backend may answer, so cached answers are keyed on the whole set of models.
+        self.model_key = "+".join(sorted({b.model for b in self.backends}))
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-hedge")
+
+    def ordered(self):
+        """Backends whose circuit is not open, by p50 (unmeasured first, to probe them)."""
+        healthy = [b for b in self.backends if b.healthy]
+        healthy.sort(key=lambda b: b.p50() or 0.0)
+        return healthy
+
+    @staticmethod
+    def _call(backend, messages, params, max_wait=0.0, timeout=None):
+        breaker = backend.breaker
+        breaker.check()
+        admission = backend.admission
+        tokens = estimate_request_tokens(messages, params)
+        if admission:
+            try:
+                admission.acquire(tokens, max_wait)
+            except RateLimited:
+                breaker.release()
+                raise
+        if timeout is not None:
+            params = dict(params, timeout=timeout)
+        stream = bool(params.get("stream"))
+        started = time.monotonic()
+        try:
+            raw = backend.client.chat.completions.with_raw_response.create(
+                model=backend.model, messages=messages, **params)
+        except Exception as e:
+            if is_outage(e):
+                backend.record(time.monotonic() - started, False, stream)
+            else:
+                # Quota and request errors say nothing about the backend's health.
+                breaker.release()
+            if admission and isinstance(e, openai.RateLimitError):
+                retry_after = parse_duration(e.response.headers.get("retry-after"))
+                admission.observe(e.response.headers)
+                admission.penalize(retry_after)
+                raise RateLimited(retry_after or 1.0, f"{backend.name} returned 429") from e
+            raise
+        backend.record(time.monotonic() - started, True, stream)
+        response = raw.parse()
+        if admission:
+            usage = getattr(response, "usage", None)
+            admission.settle(tokens, getattr(usage, "total_tokens", None))
+            # The headers describe the quota after this call, so they win over the local estimate.
+            admission.observe(raw.headers)
+        return response
+
+    def create(self, messages, **params):
+        """Run a chat completion; returns ``(response, backend_name)``.
+
+        Transient failures are retried under ``policy`` and ``budget``. Backends over
+        their quota are skipped; if all of them are, the call waits up to ``max_wait``
+        for the one that frees up first, then raises RateLimited.
+        """
+        if not self.backends:
+            raise NoBackendAvailable("No LLM backend configured")
+        return call_with_retries(
+            lambda timeout: self._create_once(messages, params, timeout),
+            self.policy, self.budget, on_retry=self._on_retry,
+        )
+
+    @staticmethod
+    def _on_retry(error, attempt, delay):
+        metrics.LLM_RETRIES.inc(error=type(error).__name__)
+
+    def _create_once(self, messages, params, timeout):
+        candidates = self.ordered()
+        if not candidates:
+            retry_after = min(b.breaker.retry_after() for b in self.backends)
+            raise CircuitOpen(retry_after or 1.0, "Every LLM backend")
+        if self.hedge and len(candidates) > 1 and not params.get("stream"):
+            return self._create_hedged(candidates, messages, params, timeout)
+        last_error = circuit_error = None
+        limited = []
+        for backend in candidates:
+            try:
+                return self._call(backend, messages, params, timeout=timeout), backend.name
+            except CircuitOpen as e:
+                # Another request holds the half-open probe; that is not this call's error.
+                circuit_error = e
+            except RateLimited as e:
+                limited.append((e.retry_after, backend))
+                last_error = e
+            except Exception as e:
+                last_error = e
+        if limited and len(limited) == len(candidates):
+            retry_after, backend = min(limited, key=lambda item: item[0])
+            if retry_after <= self.max_wait:
+                return self._call(backend, messages, params, self.max_wait, timeout), backend.name
+        raise last_error or circuit_error
+
+    def _create_hedged(self, candidates, messages, params, timeout=None):
+        primary, backup = candidates[0], candidates[1]
+        futures = {self._executor.submit(self._call, primary, messages, params, self.max_wait, timeout): primary}
+        done, _ = wait(futures, timeout=primary.p95() or self.hedge_delay)
+        if not done:
+            futures[self._executor.submit(self._call, backup, messages, params, 0.0, timeout)] = backup
+        last_error = None
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result(), futures[future].name
+                except Exception as e:
+                    last_error = e
+        for backend in candidates[2:] if len(futures) > 1 else candidates[1:]:
+            try:
+                return self._call(backend, messages, params, timeout=timeout), backend.name
+            except Exception as e:
+                last_error = e
+        raise last_error
+
+    def stats(self):
+        return {
+            "hedge": self.hedge,
+            "retry_policy": asdict(self.policy),
+            "retry_budget": self.budget.stats(),
+            "backends": [b.stats() for b in self.backends],
+        }
+
+
+def make_admission(rpm, tpm):
+    """Admission controller for a backend; headers are followed even without configured limits."""
+    return AdmissionController(
+        rpm=float(rpm) if rpm else None,
+        tpm=float(tpm) if tpm else None,
+        max_wait=float(os.getenv("LLM_ADMISSION_MAX_WAIT", "10")),
+    )
+
+
+def load_backends():
+    raw = os.getenv("LLM_BACKENDS")
+    cooldown = float(os.getenv("LLM_BACKEND_COOLDOWN", "30"))
+    if not raw:
+        api_key = os.getenv("GROQ_API_KEY") or os.getenv("GROK_API_KEY")
+        if not api_key:
+            return []
+        return [Backend("groq", GROQ_BASE_URL, DEFAULT_MODEL, api_key, cooldown=cooldown,
+                        admission=make_admission(os.getenv("LLM_RPM"), os.getenv("LLM_TPM")))]
+    backends = []
+    for entry in json.loads(raw):
+        api_key = entry.get("api_key") or os.getenv(entry.get("api_key_env", "GROQ_API_KEY"))
+        if not api_key:
+            continue
+        backends.append(Backend(
+            entry.get("name") or entry["base_url"],
+            entry["base_url"],
+            entry.get("model", DEFAULT_MODEL),
+            api_key,
+            timeout=float(entry.get("timeout", 60)),
+            cooldown=cooldown,
+            admission=make_admission(entry.get("rpm"), entry.get("tpm")),
+        ))
+    return backends
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def model_key():
+    """Models the configured backends run, for result cache keys; changing them starts a fresh cache."""
+    router = get_router()
+    return router.model_key if router else DEFAULT_MODEL
+
+
+def get_router():
+    """Process-wide router, or None when no backend has credentials."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            backends = load_backends()
+            if not backends:
+                return None
+            _router = LLMRouter(
+                backends,
+                hedge=os.getenv("LLM_HEDGE", "0") == "1",
+                hedge_delay=float(os.getenv("LLM_HEDGE_DELAY", "2.0")),
+                max_wait=float(os.getenv("LLM_ADMISSION_MAX_WAIT", "10")),
+                policy=RetryPolicy.from_env(),
+                budget=RetryBudget(ratio=float(os.getenv("LLM_RETRY_BUDGET", "0.2"))),
+            )
+        return _router
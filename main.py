@@ -18,97 +18,7 @@ CAROUSEL_IMAGES = [
     "https://images.unsplash.com/photo-1522071820081-009f0129c71c?w=1200&q=80",  # collaboration
 ]
 
-# Dark theme & professional styling (responsive)
-st.markdown("""
-<style>
-    /* Hero section */
-    .hero {
-        text-align: center;
-        padding: 3rem 1.5rem;
-        background: linear-gradient(135deg, rgba(22,27,34,0.98) 0%, rgba(13,17,23,0.95) 100%);
-        border-radius: 16px;
-        margin: 1.5rem 0;
-        border: 1px solid #30363d;
-        box-shadow: 0 4px 20px rgba(0,0,0,0.2);
-    }
-    .hero h1 {
-        font-size: 2.25rem;
-        background: linear-gradient(90deg, #58a6ff, #79c0ff);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        animation: fadeInUp 1s ease-out;
-    }
-    .hero p { font-size: 1.1rem; color: #8b949e; animation: fadeInUp 1s ease-out 0.2s both; }
-    
-    @keyframes fadeInUp {
-        from { opacity: 0; transform: translateY(20px); }
-        to { opacity: 1; transform: translateY(0); }
-    }
-    @keyframes slideIn {
-        from { opacity: 0; transform: translateX(-20px); }
-        to { opacity: 1; transform: translateX(0); }
-    }
-    .feature-card {
-        background: #161b22;
-        padding: 1.25rem;
-        border-radius: 12px;
-        border: 1px solid #30363d;
-        margin: 0.75rem 0;
-        animation: slideIn 0.6s ease-out both;
-    }
-    .feature-card:nth-child(1) { animation-delay: 0.1s; }
-    .feature-card:nth-child(2) { animation-delay: 0.2s; }
-    .feature-card:nth-child(3) { animation-delay: 0.3s; }
-    .feature-card:nth-child(4) { animation-delay: 0.4s; }
-    
-    .carousel-container {
-        width: 100%;
-        height: 320px;
-        overflow: hidden;
-        border-radius: 16px;
-        margin: 1.5rem 0;
-        border: 1px solid #30363d;
-        box-shadow: 0 4px 20px rgba(0,0,0,0.2);
-    }
-    .carousel-track { display: flex; width: 500%; animation: slide 20s infinite; }
-    .carousel-slide {
-        width: 20%; height: 320px; flex-shrink: 0;
-        background-size: cover; background-position: center;
-    }
-    @keyframes slide {
-        0%, 18% { transform: translateX(0); }
-        20%, 38% { transform: translateX(-20%); }
-        40%, 58% { transform: translateX(-40%); }
-        60%, 78% { transform: translateX(-60%); }
-        80%, 98% { transform: translateX(-80%); }
-        100% { transform: translateX(0); }
-    }
-    
-    @media (max-width: 1024px) {
-        .hero { padding: 2.5rem 1.25rem; }
-        .hero h1 { font-size: 1.9rem; }
-        .carousel-container, .carousel-slide { height: 260px; }
-        .feature-card { padding: 1.1rem; }
-    }
-    @media (max-width: 768px) {
-        .hero { padding: 2rem 1rem; }
-        .hero h1 { font-size: 1.6rem; }
-        .hero p { font-size: 1rem; }
-        .carousel-container, .carousel-slide { height: 220px; }
-        .feature-card { padding: 1rem; }
-        .feature-card h4 { font-size: 1rem; }
-    }
-    @media (max-width: 480px) {
-        .hero { padding: 1.5rem 0.75rem; }
-        .hero h1 { font-size: 1.35rem; }
-        .hero p { font-size: 0.95rem; }
-        .carousel-container, .carousel-slide { height: 180px; }
-        .feature-card { padding: 0.9rem; }
-        .feature-card h4 { font-size: 0.95rem; }
-        .feature-card p { font-size: 0.9rem; }
-    }
-</style>
-""", unsafe_allow_html=True)
+# Page styles live in static/css/app.css (see utils.head_assets_html).
 
 # Image carousel HTML
 carousel_html = f"""
@@ -170,35 +80,6 @@ st.markdown("---")
 tq = get_theme()
 qs = f"?theme={tq}" if tq else ""
 footer_html = f"""
-<style>
-    .app-footer {{
-        margin-top: 3rem;
-        padding: 2rem 1rem;
-        text-align: center;
-        border-top: 1px solid #30363d;
-        background: rgba(22, 27, 34, 0.5);
-        border-radius: 0 0 12px 12px;
-    }}
-    body:has(.theme-light) .app-footer {{
-        border-top-color: #dee2e6;
-        background: #f8f9fa;
-    }}
-    .app-footer a {{ color: #58a6ff; text-decoration: none; margin: 0 0.75rem; }}
-    .app-footer a:hover {{ text-decoration: underline; }}
-    body:has(.theme-light) .app-footer a {{ color: #0d6efd; }}
-    .app-footer p {{ margin: 0.5rem 0; color: #8b949e; font-size: 0.9rem; }}
-    body:has(.theme-light) .app-footer p {{ color: #6c757d; }}
-    @media (max-width: 768px) {{
-        .app-footer {{ padding: 1.5rem 0.75rem; margin-top: 2rem; }}
-        .app-footer p {{ font-size: 0.85rem; }}
-        .app-footer a {{ margin: 0 0.5rem; display: inline-block; padding: 0.25rem 0; min-height: 44px; line-height: 1.4; }}
-    }}
-    @media (max-width: 480px) {{
-        .app-footer {{ padding: 1rem 0.5rem; }}
-        .app-footer p {{ font-size: 0.8rem; }}
-        .app-footer a {{ margin: 0 0.35rem; }}
-    }}
-</style>
 <footer class="app-footer">
     <p><a href="/{qs}">Home</a> · <a href="/Analyze{qs}">Analyze</a> · <a href="/About{qs}">About</a> · <a href="/Contact{qs}">Contact</a> · <a href="/Privacy_Policy{qs}">Privacy</a></p>
     <p>© 2025 AI Resume Critiquer. Built to help you land your dream job.</p>
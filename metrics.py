@@ -0,0 +1,182 @@
+"""In-process counters and latency histograms, rendered in Prometheus text format.
+
+Each worker process keeps its own numbers; scrape every worker (or run one per
+container). When the ``opentelemetry`` API package is installed, every ``stage()``
+also opens a span, exported by whatever tracer provider the deployment configures
+(e.g. ``opentelemetry-instrument`` with ``OTEL_EXPORTER_OTLP_ENDPOINT``).
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    from opentelemetry import trace
+except ImportError:
+    trace = None
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_tracer = trace.get_tracer("resume-critiquer") if trace is not None else None
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [(self.name, _labels(self.labelnames, key), value) for key, value in items]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * len(self.buckets), 0.0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    def totals(self):
+        """{label tuple: (count, sum)}; lets benchmarks diff two snapshots."""
+        with self._lock:
+            return {key: (counts[-1], total) for key, (counts, total) in self._values.items()}
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        out = []
+        for key, (counts, total) in items:
+            for bound, count in zip(self.buckets, counts):
+                out.append((self.name + "_bucket", _labels(self.labelnames, key, [("le", _number(bound))]), count))
+            out.append((self.name + "_sum", _labels(self.labelnames, key), total))
+            out.append((self.name + "_count", _labels(self.labelnames, key), counts[-1]))
+        return out
+
+
+class CallbackCounter:
+    """Counter whose values are read at scrape time from a function returning {label tuple: value}."""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames, read):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.read = read
+
+    def samples(self):
+        return [(self.name, _labels(self.labelnames, key), value) for key, value in sorted(self.read().items())]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "resume_stage_duration_seconds", "Time spent in each analysis stage.", ["stage"]))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "resume_http_request_duration_seconds", "Time to produce a response, by endpoint and status.",
+    ["endpoint", "status"]))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "resume_llm_tokens_total", "Upstream tokens reported in response.usage.", ["backend", "kind"]))
+PARSE_FAILURES = REGISTRY.register(Counter(
+    "resume_parse_failures_total", "Model answers that could not be parsed as JSON."))
+JSON_REPAIRS = REGISTRY.register(Counter(
+    "resume_json_repairs_total", "Defects fixed while parsing model output, by kind.", ["repair"]))
+LLM_RETRIES = REGISTRY.register(Counter(
+    "resume_llm_retries_total", "Upstream calls retried after a transient error, by error class.", ["error"]))
+DEGRADED = REGISTRY.register(Counter(
+    "resume_degraded_responses_total", "Local-only results served because the LLM circuit was open.",
+    ["endpoint"]))
+ERRORS = REGISTRY.register(Counter(
+    "resume_errors_total", "Exceptions raised while handling a request, by endpoint and class.",
+    ["endpoint", "error"]))
+
+
+@contextmanager
+def stage(name):
+    """Time a block into resume_stage_duration_seconds (and an OpenTelemetry span, if available)."""
+    started = time.perf_counter()
+    if _tracer is None:
+        try:
+            yield
+        finally:
+            STAGE_SECONDS.observe(time.perf_counter() - started, stage=name)
+        return
+    with _tracer.start_as_current_span(f"analysis.{name}"):
+        try:
+            yield
+        finally:
+            STAGE_SECONDS.observe(time.perf_counter() - started, stage=name)
+
+
+def record_usage(usage, backend):
+    """Count prompt/completion tokens from an OpenAI-style usage object."""
+    if usage is None:
+        return
+    for kind in ("prompt", "completion"):
+        tokens = getattr(usage, f"{kind}_tokens", None)
+        if tokens:
+            LLM_TOKENS.inc(tokens, backend=backend, kind=kind)
+
+
+def record_error(endpoint, error):
+    ERRORS.inc(endpoint=endpoint, error=type(error).__name__)
@@ -0,0 +1,179 @@
+"""Near-duplicate resume detection, so almost identical uploads reuse an earlier analysis.
+
+The result cache is keyed on exact text, so a fixed typo, a new phone number or the
+same resume exported again from Word all miss it. Here each resume is reduced to its
+word 5-shingles, and a bottom-k MinHash sketch (the k smallest shingle hashes) stands
+in for the set. Two sketches give an estimate of the shingle sets' Jaccard similarity.
+An inverted index from sketch hashes to stored resumes finds candidates without a scan.
+
+Entries only point at result cache keys, so a reused analysis is never older than the
+result cache allows. Only resumes that got a full model analysis are indexed, so reuse
+does not drift through chains of small edits.
+"""
+import hashlib
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+
+from cache import normalize_text
+
+WORD_RE = re.compile(r"\w+")
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+
+
+def shingle_hashes(text, size=5):
+    """64-bit hashes of the word ``size``-grams of ``text``, lowercased."""
+    words = WORD_RE.findall(text.lower())
+    if len(words) < size:
+        words = words + [""] * (size - len(words))
+    return {
+        int.from_bytes(hashlib.blake2b(" ".join(words[i:i + size]).encode("utf-8"), digest_size=8).digest(), "big")
+        for i in range(len(words) - size + 1)
+    }
+
+
+def sketch(text, k=128, size=5):
+    """Bottom-k MinHash sketch: the ``k`` smallest shingle hashes, ascending."""
+    return tuple(sorted(shingle_hashes(text, size))[:k])
+
+
+def similarity(a, b, k=128):
+    """Estimated Jaccard similarity of the shingle sets behind sketches ``a`` and ``b``.
+
+    Exact when both resumes have fewer than ``k`` shingles.
+    """
+    b_set = set(b)
+    union = sorted(set(a) | b_set)[:k]
+    if not union:
+        return 0.0
+    a_set = set(a)
+    return sum(1 for h in union if h in a_set and h in b_set) / len(union)
+
+
+def context_key(text, job_desc, role, model, prompt_version):
+    """Resumes are only compared within the same job description, role and prompt.
+
+    Email addresses are part of the context too: two different people's resumes can
+    be near-identical (a shared template), and one must not get an analysis of the other.
+    """
+    emails = sorted({e.lower() for e in EMAIL_RE.findall(text)})
+    parts = [normalize_text(job_desc), normalize_text(role).lower(), model, str(prompt_version), ",".join(emails)]
+    return hashlib.blake2b("\0".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+
+class NearDuplicateIndex:
+    """LRU-bounded index of resume sketches, each pointing at a result cache key."""
+
+    def __init__(self, threshold=0.9, k=128, shingle_size=5, max_entries=4096):
+        self.threshold = threshold
+        self.k = k
+        self.shingle_size = shingle_size
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # cache key -> (context, sketch)
+        self._postings = {}  # (context, hash) -> set of cache keys
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return 0 < self.threshold <= 1
+
+    def sketch(self, text):
+        return sketch(text, self.k, self.shingle_size) if self.enabled else ()
+
+    def find(self, context, signature, lookup):
+        """(value, similarity) for the most similar indexed resume at or above the threshold.
+
+        ``lookup(key)`` fetches the stored result; keys it no longer has are dropped.
+        Returns None when nothing qualifies.
+        """
+        if not self.enabled or not signature:
+            return None
+        with self._lock:
+            shared = Counter()
+            for h in signature:
+                shared.update(self._postings.get((context, h), ()))
+            # A resume this similar shares most of its sketch; skip the rest unscored.
+            needed = max(1, int(self.threshold * len(signature) / 2))
+            scored = sorted(
+                ((similarity(signature, self._entries[key][1], self.k), key)
+                 for key, count in shared.items() if count >= needed),
+                reverse=True,
+            )
+        for score, key in scored:
+            if score < self.threshold:
+                break
+            value = lookup(key)
+            if value is None:
+                self.discard(key)
+                continue
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                self.hits += 1
+            return value, score
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def add(self, context, signature, key):
+        if not self.enabled or not signature:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (context, signature)
+            for h in signature:
+                self._postings.setdefault((context, h), set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def discard(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        context, signature = entry
+        for h in signature:
+            keys = self._postings.get((context, h))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[(context, h)]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._postings.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "threshold": self.threshold,
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_near_duplicate_index():
+    """Process-wide index configured from NEAR_DUPLICATE_* environment variables."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = NearDuplicateIndex(
+                threshold=float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.9")),
+                max_entries=int(os.getenv("NEAR_DUPLICATE_MAX_ENTRIES", "4096")),
+            )
+        return _index
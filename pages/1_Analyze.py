@@ -1,144 +1,63 @@
-"""AI Resume Analysis page with professional ATS-focused results."""
+"""AI Resume Analysis page with professional ATS-focused results.
+
+The last result is kept in ``st.session_state``, so widget changes and theme toggles
+re-render it without calling the model again. ``analyze_upload`` is wrapped in
+``st.cache_data`` and keyed on the upload digest plus the inputs; analyzing the same
+file with the same inputs again skips extraction, scoring and the LLM call.
+"""
+import os
+
 import streamlit as st
-from utils import get_groq_client, extract_text_from_file, parse_ai_json, render_top_navbar
+from utils import extract_document, render_top_navbar
+from analysis_schema import (
+    PROMPT_VERSION,
+    build_analysis_prompt,
+    build_messages,
+    build_prompt_context,
+    completion_params,
+    parse_analysis,
+)
+from cache import get_result_cache, make_cache_key, upload_digest
+from compaction import compact_inputs, compact_job_description
+from llm_router import get_router, model_key
+from jd_store import get_jd_store, load_postings
+from near_duplicates import context_key, get_near_duplicate_index
+from ratelimit import RateLimited
+from resilience import CircuitOpen
+from scoring import job_profile, merge_local_scores, score_resume
+
+# st.cache_data bounds, shared by every session in the process.
+ANALYSIS_CACHE_ENTRIES = int(os.getenv("STREAMLIT_ANALYSIS_CACHE_ENTRIES", "128"))
+ANALYSIS_CACHE_TTL = int(os.getenv("STREAMLIT_ANALYSIS_CACHE_TTL", "3600"))
+JD_STORE_WARM_FILE = os.getenv("JD_STORE_WARM_FILE")
 
 st.set_page_config(page_title="Analyze Resume | AI Resume Critiquer", page_icon="📊", layout="wide", initial_sidebar_state="collapsed")
 render_top_navbar()
 
-# Custom styles for analysis results (responsive)
-st.markdown("""
-<style>
-    .ats-score-card {
-        background: linear-gradient(135deg, #1e3a5f 0%, #0d2137 100%);
-        padding: 2rem;
-        border-radius: 16px;
-        text-align: center;
-        margin-bottom: 2rem;
-        border: 1px solid #2d5a87;
-        box-shadow: 0 4px 20px rgba(0,0,0,0.3);
-    }
-    .ats-score-number { font-size: 3rem; font-weight: 700; color: #4fc3f7; }
-    .ats-pass { color: #4caf50; }
-    .ats-fail { color: #f44336; }
-    .ats-moderate { color: #ff9800; }
-    .section-card {
-        background: #1a2634;
-        padding: 1.5rem;
-        border-radius: 12px;
-        margin-bottom: 1.5rem;
-        border-left: 4px solid #2d5a87;
-    }
-    .skill-found { color: #4caf50; }
-    .skill-missing { color: #f44336; }
-    .progress-bar-container {
-        background: #0d2137;
-        border-radius: 8px;
-        height: 12px;
-        margin: 0.5rem 0;
-        overflow: hidden;
-    }
-    .progress-bar-fill { height: 100%; border-radius: 8px; transition: width 0.5s ease; }
-    @media (max-width: 768px) {
-        .ats-score-card { padding: 1.5rem 1rem; }
-        .ats-score-number { font-size: 2.25rem; }
-        .section-card { padding: 1rem; }
-    }
-    @media (max-width: 480px) {
-        .ats-score-card { padding: 1rem 0.75rem; }
-        .ats-score-number { font-size: 1.85rem; }
-        .section-card { padding: 0.85rem; }
-    }
-</style>
-""", unsafe_allow_html=True)
-
-
 st.title("📊 AI Resume Analysis")
 st.markdown("Upload your resume and get professional ATS-focused feedback with actionable insights.")
 
-client, api_key = get_groq_client()
+# Shared with every session in this process, so all of them draw on one upstream quota.
+router = get_router()
+
+
+@st.cache_resource(show_spinner=False)
+def warm_job_descriptions():
+    """Preprocess JD_STORE_WARM_FILE's postings once per process."""
+    if JD_STORE_WARM_FILE:
+        get_jd_store().warm(load_postings(JD_STORE_WARM_FILE), compact_job_description, job_profile)
+
+
+warm_job_descriptions()
 
 uploaded_file = st.file_uploader("Upload your resume (PDF or TXT)", type=["pdf", "txt"], key="resume_upload")
 job_description = st.text_area("Paste Job Description (optional - for Resume vs Job Match analysis)", height=120, key="job_desc")
 job_role = st.text_input("Target job role (optional)", key="job_role", placeholder="e.g., Frontend Developer")
+fast_mode = st.toggle("⚡ Fast mode (instant local ATS scores, no AI call)", key="fast_mode")
 
 analyze_btn = st.button("🔍 Analyze Resume", type="primary", use_container_width=True)
 
 
-def build_analysis_prompt(resume_text: str, job_desc: str | None, role: str | None) -> str:
-    """Build comprehensive prompt for structured resume analysis."""
-    role_ctx = role or "general job applications"
-    job_section = ""
-    if job_desc:
-        job_section = f"""
-JOB DESCRIPTION (for match analysis):
-{job_desc}
-
-"""
-    return f"""Analyze this resume and return a JSON object with the following structure. Return ONLY valid JSON, no other text.
-
-{job_section}TARGET ROLE: {role_ctx}
-
-RESUME CONTENT:
-{resume_text}
-
-Return this exact JSON structure (use null for job_match if no job description provided):
-
-{{
-  "ats_score": <number 0-100>,
-  "ats_status": "<Pass|Moderate|Needs Improvement|Fail>",
-  "ats_breakdown": {{
-    "keywords": <0-100>,
-    "formatting": <0-100>,
-    "sections": <0-100>,
-    "readability": <0-100>
-  }},
-  "resume_summary": "<4-6 line professional summary of the candidate>",
-  "skills": {{
-    "found_technical": ["skill1", "skill2"],
-    "found_soft": ["skill1", "skill2"],
-    "missing": ["skill1", "skill2"]
-  }},
-  "job_match": {{
-    "match_percentage": <0-100>,
-    "matching_keywords": ["kw1", "kw2"],
-    "missing_keywords": ["kw1", "kw2"],
-    "skill_gap_analysis": "<brief analysis>"
-  }}  OR null if no job description,
-  "keywords": {{
-    "density_analysis": "<brief analysis>",
-    "present": ["kw1", "kw2"],
-    "missing": ["kw1", "kw2"],
-    "suggested": ["kw1", "kw2"]
-  }},
-  "experience": {{
-    "years": <number or float>,
-    "roles": ["role1", "role2"],
-    "career_progression": "<brief analysis>"
-  }},
-  "education": [
-    {{"degree": "...", "university": "...", "year": "...", "relevance": "..."}}
-  ],
-  "formatting": {{
-    "file_type": "PDF or TXT",
-    "tables_detected": true/false,
-    "headings_ok": true/false,
-    "graphics_issues": "<description or None>",
-    "length_pages": <estimated pages>,
-    "issues": ["issue1", "issue2"],
-    "compliant": true/false
-  }},
-  "strengths": ["strength1", "strength2"],
-  "weaknesses": ["weakness1", "weakness2"],
-  "improvements": ["suggestion1", "suggestion2"],
-  "bonus_metrics": {{
-    "readability_score": <0-100>,
-    "length_score": <0-100>,
-    "grammar_score": <0-100>,
-    "section_completeness": <0-100>
-  }}
-}}"""
-
-
 def render_results(data: dict):
     """Render analysis results in professional layout."""
     # 1. ATS Score
@@ -276,38 +195,132 @@ def render_results(data: dict):
                     st.metric(label, f"{val}/100", "")
 
 
+class EmptyDocument(Exception):
+    pass
+
+
+class UnparsedAnswer(Exception):
+    def __init__(self, raw):
+        super().__init__("Could not parse structured output")
+        self.raw = raw
+
+
+class Degraded(Exception):
+    """The LLM circuit is open; ``result`` holds the local scores, which must not be cached."""
+
+    def __init__(self, result, error):
+        super().__init__(str(error))
+        self.result = result
+        self.retry_after = error.retry_after
+
+
+class TruncatedAnswer(Exception):
+    """The model's answer was cut off and repaired; ``result`` is usable but must not be cached."""
+
+    def __init__(self, result):
+        super().__init__("The analysis was cut off")
+        self.result = result
+
+
+@st.cache_data(max_entries=ANALYSIS_CACHE_ENTRIES, ttl=ANALYSIS_CACHE_TTL, show_spinner=False)
+def analyze_upload(digest, _uploaded_file, job_desc, role, fast):
+    """Extract, score and (unless ``fast``) analyze an upload.
+
+    Keyed on ``digest`` and the inputs; the leading underscore keeps the file object
+    itself out of the cache key. Failures and cut-off answers raise, so they are never cached.
+    """
+    document = extract_document(_uploaded_file)
+    file_content = document.text
+    if not file_content.strip():
+        raise EmptyDocument("File has no extractable content.")
+    notices = []
+    if document.truncated:
+        notices.append(f"Only the first {document.pages_extracted} of {document.pages_total or '?'} pages could be read; analysis uses the partial text.")
+    file_type = "PDF" if _uploaded_file.type == "application/pdf" else "TXT"
+    local = score_resume(file_content, job_desc, role, file_type, document.pages_total)
+    if fast:
+        return {"data": local, "notices": notices, "tokens": None}
+
+    compacted = compact_inputs(file_content, job_desc)
+    result = {"data": None, "notices": notices, "tokens": compacted.stats}
+    cache = get_result_cache()
+    cache_key = make_cache_key(compacted.resume, compacted.job_desc, role, model_key(), PROMPT_VERSION)
+    result["data"] = cache.get(cache_key)
+    if result["data"] is not None:
+        return result
+    near = get_near_duplicate_index()
+    near_key = (context_key(file_content, job_desc, role, model_key(), PROMPT_VERSION), near.sketch(file_content))
+    found = near.find(*near_key, cache.peek)
+    if found is not None:
+        prior, similarity = found
+        notices.append(f"Reused the analysis of an almost identical resume ({similarity:.0%} similar); "
+                       "ATS scores were recomputed for this file.")
+        result["data"] = merge_local_scores(prior, local)
+        return result
+
+    prompt = build_analysis_prompt(compacted.resume, context=build_prompt_context(compacted.job_desc, role))
+    try:
+        response, _ = router.create(build_messages(prompt), **completion_params())
+    except CircuitOpen as e:
+        raise Degraded(dict(result, data=local), e) from e
+    raw = response.choices[0].message.content
+    data, repairs, _ = parse_analysis(raw)
+    if not data:
+        raise UnparsedAnswer(raw)
+    result["data"] = merge_local_scores(data, local)
+    # Raised rather than returned, so st.cache_data does not keep it either.
+    if "truncated" in repairs:
+        raise TruncatedAnswer(result)
+    cache.set(cache_key, result["data"])
+    near.add(*near_key, cache_key)
+    return result
+
+
+def show_result(result):
+    for notice in result["notices"]:
+        st.warning(notice)
+    tokens = result["tokens"]
+    if tokens:
+        st.caption(f"Prompt input trimmed from ~{tokens['before']:,} to ~{tokens['after']:,} tokens.")
+    render_results(result["data"])
+
+
+def input_key(uploaded_file):
+    """Identifies the inputs a result was computed for, without hashing the file on every rerun."""
+    return (uploaded_file.file_id if uploaded_file else None, job_description.strip(), job_role.strip(), fast_mode)
+
+
 if analyze_btn and uploaded_file:
-    if not api_key:
+    if not router and not fast_mode:
         st.error("Please set GROQ_API_KEY in your .env file (get free key at https://console.groq.com).")
         st.stop()
 
+    job_desc = job_description if job_description.strip() else None
+    role = job_role if job_role.strip() else None
+    # Only the last result is kept per session, so its footprint stays at one analysis.
+    st.session_state.pop("last_analysis", None)
     try:
         with st.spinner("**Analyzing your resume…** ATS score, skills, and recommendations will be ready in a moment."):
-            file_content = extract_text_from_file(uploaded_file)
-
-            if not file_content.strip():
-                st.error("File has no extractable content.")
-                st.stop()
-
-            prompt = build_analysis_prompt(file_content, job_description if job_description.strip() else None, job_role if job_role.strip() else None)
-
-            response = client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[
-                    {"role": "system", "content": "You are an expert ATS resume analyst and HR professional. Return ONLY valid JSON."},
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=0.3,
-                max_tokens=4000,
-            )
-            raw = response.choices[0].message.content
-
-        data = parse_ai_json(raw)
-        if data:
-            render_results(data)
-        else:
-            st.warning("Could not parse structured output. Raw response:")
-            st.markdown(raw)
-
+            result = analyze_upload(upload_digest(uploaded_file), uploaded_file, job_desc, role, fast_mode)
+        st.session_state["last_analysis"] = {"key": input_key(uploaded_file), "result": result}
+    except Degraded as e:
+        st.warning(f"AI analysis is unavailable right now (retry in {e.retry_after} s); showing the local ATS scores only.")
+        st.session_state["last_analysis"] = {"key": input_key(uploaded_file), "result": e.result}
+    except TruncatedAnswer as e:
+        st.warning("The AI answer was cut off, so some sections may be incomplete. Click Analyze again for a complete one.")
+        st.session_state["last_analysis"] = {"key": input_key(uploaded_file), "result": e.result}
+    except UnparsedAnswer as e:
+        st.warning("Could not parse structured output. Raw response:")
+        st.markdown(e.raw)
+    except EmptyDocument as e:
+        st.error(str(e))
+    except RateLimited as e:
+        st.warning(f"The analysis service is busy right now. Please try again in {e.retry_after} seconds.")
     except Exception as e:
         st.error(f"An error occurred: {str(e)}")
+
+last = st.session_state.get("last_analysis")
+if last:
+    if last["key"] != input_key(uploaded_file):
+        st.info("Showing the previous analysis. Click Analyze to update it for the changed inputs.")
+    show_result(last["result"])
@@ -0,0 +1,217 @@
+"""Token-bucket admission control for upstream quota and per-client request limits.
+
+``AdmissionController`` holds one bucket for requests per minute and one for
+tokens per minute. Each call is charged its estimated token count before it is
+sent, and corrected once ``usage`` comes back. ``x-ratelimit-*`` response headers
+and 429s tighten the buckets, so the app settles just under the provider's limits
+instead of tripping them. Calls that would wait longer than ``max_wait`` are shed
+with ``RateLimited``. As in resilience.py, the clock and the wait can be replaced in
+tests.
+"""
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+class RateLimited(Exception):
+    """Raised when a call cannot be admitted within the allowed wait."""
+
+    def __init__(self, retry_after, reason="Rate limit reached"):
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(f"{reason}, retry after {self.retry_after}s")
+
+
+def parse_duration(value):
+    """Seconds from a rate-limit header value such as "2m59.56s", "7.66s", "120ms" or "30"."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _UNITS[unit] for amount, unit in parts)
+
+
+def client_address(remote_addr, forwarded_for, trusted_proxies):
+    """Client IP behind ``trusted_proxies`` proxies, read from X-Forwarded-For as werkzeug's ProxyFix does.
+
+    Falls back to ``remote_addr`` when the header has fewer hops than that.
+    """
+    if trusted_proxies and forwarded_for:
+        hops = [hop.strip() for hop in forwarded_for.split(",")]
+        if len(hops) >= trusted_proxies:
+            return hops[-trusted_proxies]
+    return remote_addr
+
+
+class TokenBucket:
+    """``capacity`` units, refilled continuously at ``capacity`` per ``period`` seconds."""
+
+    def __init__(self, capacity, period=60.0, now=None):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period
+        self.level = self.capacity
+        self._updated = time.monotonic() if now is None else now
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until ``amount`` can be taken; amounts above capacity wait for a full bucket."""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate) if self.rate else math.inf
+
+    def take(self, amount, now):
+        """Remove ``amount`` (a negative amount refunds); the level may go below zero."""
+        self._refill(now)
+        self.level = min(self.capacity, self.level - amount)
+
+    def clamp(self, level, now):
+        self._refill(now)
+        self.level = min(self.level, level)
+
+
+class AdmissionController:
+    """Requests-per-minute and tokens-per-minute admission for one upstream quota.
+
+    Either limit may be None; the controller then only follows response headers.
+    ``wait(seconds)`` blocks a caller that has to queue; it defaults to waiting on the
+    controller's condition, so a refund from ``settle`` wakes it early.
+    """
+
+    def __init__(self, rpm=None, tpm=None, max_wait=10.0, clock=time.monotonic, wait=None):
+        self.clock = clock
+        self.requests = TokenBucket(rpm, now=clock()) if rpm else None
+        self.tokens = TokenBucket(tpm, now=clock()) if tpm else None
+        self.max_wait = max_wait
+        self._blocked_until = {"requests": 0.0, "tokens": 0.0}
+        self._cond = threading.Condition()
+        self._wait = wait or self._cond.wait
+        self.admitted = 0
+        self.shed = 0
+        self.waited = 0.0
+
+    def _wait_time(self, tokens, now):
+        waits = [until - now for until in self._blocked_until.values()]
+        if self.requests:
+            waits.append(self.requests.wait_time(1, now))
+        if self.tokens:
+            waits.append(self.tokens.wait_time(tokens, now))
+        return max([0.0] + waits)
+
+    def acquire(self, tokens, max_wait=None):
+        """Block until ``tokens`` (and one request) are available, or raise RateLimited."""
+        max_wait = self.max_wait if max_wait is None else max_wait
+        deadline = self.clock() + max_wait
+        with self._cond:
+            while True:
+                now = self.clock()
+                wait = self._wait_time(tokens, now)
+                if wait <= 0:
+                    if self.requests:
+                        self.requests.take(1, now)
+                    if self.tokens:
+                        self.tokens.take(tokens, now)
+                    self.admitted += 1
+                    return
+                if now + wait > deadline:
+                    self.shed += 1
+                    raise RateLimited(wait, "Upstream rate limit reached")
+                self.waited += wait
+                self._wait(wait)
+
+    def settle(self, estimated, actual):
+        """Charge (or refund) the difference once the real token count is known."""
+        if self.tokens and actual is not None:
+            with self._cond:
+                self.tokens.take(actual - estimated, self.clock())
+                self._cond.notify_all()
+
+    def observe(self, headers):
+        """Tighten the buckets from x-ratelimit-remaining-* / x-ratelimit-reset-* headers."""
+        if not headers:
+            return
+        now = self.clock()
+        with self._cond:
+            for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+                remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                if remaining is None:
+                    continue
+                try:
+                    remaining = float(remaining)
+                except ValueError:
+                    continue
+                if bucket:
+                    bucket.clamp(remaining, now)
+                reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                if remaining <= 0 and reset:
+                    self._blocked_until[kind] = max(self._blocked_until[kind], now + reset)
+
+    def penalize(self, retry_after):
+        """After a 429: admit nothing until ``retry_after`` seconds have passed."""
+        until = self.clock() + (retry_after or 1.0)
+        with self._cond:
+            for kind in self._blocked_until:
+                self._blocked_until[kind] = max(self._blocked_until[kind], until)
+
+    def stats(self):
+        with self._cond:
+            now = self.clock()
+            return {
+                "rpm": self.requests.capacity if self.requests else None,
+                "tpm": self.tokens.capacity if self.tokens else None,
+                "requests_available": round(self.requests.level, 2) if self.requests else None,
+                "tokens_available": round(self.tokens.level) if self.tokens else None,
+                "blocked_for": round(max(0.0, *(u - now for u in self._blocked_until.values())), 2),
+                "admitted": self.admitted,
+                "shed": self.shed,
+                "waited_seconds": round(self.waited, 2),
+            }
+
+
+class ClientLimiter:
+    """Per-client token buckets (e.g. keyed by IP), LRU-bounded to ``max_clients``."""
+
+    def __init__(self, per_minute=10, burst=5, max_clients=10000):
+        self.per_minute = per_minute
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def check(self, key):
+        """Take one request for ``key``; raise RateLimited when its bucket is empty."""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.burst, 60.0 * self.burst / self.per_minute, now)
+                while len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            self._buckets.move_to_end(key)
+            wait = bucket.wait_time(1, now)
+            if wait > 0:
+                self.rejected += 1
+                raise RateLimited(wait, "Too many requests from this client")
+            bucket.take(1, now)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "per_minute": self.per_minute,
+                "burst": self.burst,
+                "clients": len(self._buckets),
+                "rejected": self.rejected,
+            }
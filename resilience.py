@@ -0,0 +1,256 @@
+"""Retry and circuit-breaker policy for upstream calls.
+
+``call_with_retries`` runs a call under a ``RetryPolicy``. Each attempt gets its own
+timeout, and the whole call has a total deadline. Failed attempts back off
+exponentially with full jitter. Retries also draw on a shared ``RetryBudget``, so an
+outage cannot multiply the load sent upstream. A ``CircuitBreaker`` opens after
+repeated failures and fails fast until a single probe call gets through again.
+
+Nothing here talks to the network. The clock, sleep and random source can be
+replaced, so the policies can be driven by a fake upstream in tests.
+"""
+import os
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+import openai
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Status codes worth another attempt; other 4xx errors fail the same way every time.
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling an upstream whose breaker is open."""
+
+    def __init__(self, retry_after, name="upstream"):
+        self.retry_after = max(1, int(retry_after + 0.999))
+        super().__init__(f"{name} is unavailable, retry after {self.retry_after}s")
+
+
+class DeadlineExceeded(Exception):
+    """The total deadline ran out before an attempt succeeded."""
+
+
+def is_retryable(error):
+    """True for timeouts, connection errors, 5xx, 408, 409 and upstream 429s.
+
+    ratelimit.RateLimited is not retried: admission control has already waited as
+    long as it is allowed to.
+    """
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS or error.status_code >= 500
+    return False
+
+
+def is_outage(error):
+    """True for failures that say the upstream itself is unwell (not quota or bad input)."""
+    return is_retryable(error) and not isinstance(error, openai.RateLimitError)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+    attempt_timeout: float = 30.0
+    total_timeout: float = 60.0
+
+    def delay(self, attempt, rng=random):
+        """Full jitter: uniform between 0 and the capped exponential step for ``attempt`` (0-based)."""
+        return rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_attempts=int(os.getenv("LLM_RETRY_ATTEMPTS", "3")),
+            base_delay=float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5")),
+            max_delay=float(os.getenv("LLM_RETRY_MAX_DELAY", "8")),
+            attempt_timeout=float(os.getenv("LLM_ATTEMPT_TIMEOUT", "30")),
+            total_timeout=float(os.getenv("LLM_TOTAL_TIMEOUT", "60")),
+        )
+
+
+class RetryBudget:
+    """Allow retries up to ``ratio`` of recent calls, plus ``min_retries`` per window.
+
+    With ratio 0.2, a failing upstream sees at most about 1.2x the normal request
+    rate, however many attempts each call would like to make.
+    """
+
+    def __init__(self, ratio=0.2, min_retries=3, window=10.0, clock=time.monotonic):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window = window
+        self.clock = clock
+        self._calls = deque()
+        self._retries = deque()
+        self._lock = threading.Lock()
+        self.exhausted = 0
+
+    def _trim(self, now):
+        for events in (self._calls, self._retries):
+            while events and events[0] <= now - self.window:
+                events.popleft()
+
+    def record_call(self):
+        with self._lock:
+            now = self.clock()
+            self._trim(now)
+            self._calls.append(now)
+
+    def try_spend(self):
+        """Take one retry from the budget; False when it is used up."""
+        with self._lock:
+            now = self.clock()
+            self._trim(now)
+            if len(self._retries) >= self.min_retries + self.ratio * len(self._calls):
+                self.exhausted += 1
+                return False
+            self._retries.append(now)
+            return True
+
+    def stats(self):
+        with self._lock:
+            self._trim(self.clock())
+            return {
+                "ratio": self.ratio,
+                "calls": len(self._calls),
+                "retries": len(self._retries),
+                "exhausted": self.exhausted,
+            }
+
+
+class CircuitBreaker:
+    """Closed → open after failures → half-open after ``reset_timeout`` → one probe decides.
+
+    Opens on ``failure_threshold`` consecutive failures, or when more than
+    ``max_error_rate`` of the last ``window`` outcomes (at least five) failed.
+    """
+
+    def __init__(self, name="upstream", failure_threshold=3, max_error_rate=0.5, window=50,
+                 reset_timeout=30.0, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.max_error_rate = max_error_rate
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._outcomes = deque(maxlen=window)
+        self._consecutive_failures = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.opened = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def retry_after(self):
+        with self._lock:
+            if self._state == CLOSED:
+                return 0.0
+            return max(0.0, self._opened_at + self.reset_timeout - self.clock())
+
+    def allow(self):
+        """Whether a call may go out now. In half-open state only one probe is let through."""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                if self.clock() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = HALF_OPEN
+                self._probing = False
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def check(self):
+        """Like ``allow``, but raises CircuitOpen instead of returning False."""
+        if not self.allow():
+            raise CircuitOpen(self.retry_after() or 1.0, self.name)
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = self.clock()
+        self._probing = False
+        self.opened += 1
+
+    def record(self, ok):
+        with self._lock:
+            self._outcomes.append(ok)
+            if ok:
+                self._consecutive_failures = 0
+                if self._state != CLOSED:
+                    self._state = CLOSED
+                    self._probing = False
+                    self._outcomes.clear()
+                return
+            self._consecutive_failures += 1
+            if self._state == HALF_OPEN:
+                self._open()
+                return
+            failures = sum(1 for outcome in self._outcomes if not outcome)
+            if (self._consecutive_failures >= self.failure_threshold
+                    or (len(self._outcomes) >= 5 and failures / len(self._outcomes) > self.max_error_rate)):
+                self._open()
+
+    def release(self):
+        """Give back a half-open probe slot whose call ended without a verdict (e.g. a 400)."""
+        with self._lock:
+            self._probing = False
+
+    def error_rate(self):
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return sum(1 for outcome in self._outcomes if not outcome) / len(self._outcomes)
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "error_rate": round(self.error_rate(), 4),
+            "retry_after": round(self.retry_after(), 2),
+            "opened": self.opened,
+        }
+
+
+def call_with_retries(call, policy, budget=None, on_retry=None, sleep=time.sleep,
+                      clock=time.monotonic, rng=random):
+    """Run ``call(timeout)`` under ``policy``; ``timeout`` is what is left for that attempt.
+
+    Non-retryable errors (including CircuitOpen) propagate at once. A retry happens only
+    if the backoff still fits in the total deadline and the budget allows it.
+    """
+    deadline = clock() + policy.total_timeout
+    if budget is not None:
+        budget.record_call()
+    for attempt in range(policy.max_attempts):
+        remaining = deadline - clock()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"No answer within {policy.total_timeout:g}s")
+        try:
+            return call(min(policy.attempt_timeout, remaining))
+        except Exception as e:
+            if not is_retryable(e) or attempt + 1 >= policy.max_attempts:
+                raise
+            delay = policy.delay(attempt, rng)
+            if clock() + delay >= deadline or (budget is not None and not budget.try_spend()):
+                raise
+            if on_retry is not None:
+                on_retry(e, attempt + 1, delay)
+            sleep(delay)
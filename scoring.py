@@ -0,0 +1,425 @@
+"""Deterministic local ATS scoring computed from extracted resume text."""
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+import numpy as np
+
+from compaction import clean_job_description
+from jd_store import get_jd_store
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each either etc few for from
+further had has have having he her here hers him his how i if in into is it its itself just may
+me more most must my no nor not of off on once only or other our ours out over own per same she
+should so some such than that the their theirs them then there these they this those through to
+too under until up upon us very was we were what when where which while who whom why will with
+within without would you your yours able ability across work working years year experience
+strong excellent good great including include includes using use used well new role team teams
+job candidate candidates position responsibilities requirements required preferred plus
+need needs looking seeking join ideal ideally knowledge familiarity understanding skills nice
+""".split())
+
+SECTION_PATTERNS = {
+    "summary": r"(professional\s+)?summary|profile|objective|about\s+me",
+    "experience": r"(work|professional|employment)?\s*(experience|history)|employment",
+    "education": r"education|academic(s|\s+background)?|qualifications",
+    "skills": r"(technical\s+|core\s+|key\s+)?skills|competencies|technologies|tech\s+stack",
+    "projects": r"(personal\s+|selected\s+)?projects",
+    "certifications": r"certifications?|licen[cs]es?|courses",
+    "awards": r"awards|honou?rs|achievements",
+}
+CORE_SECTIONS = ("contact", "summary", "experience", "education", "skills")
+
+_HEADING_RES = {name: re.compile(rf"^\W*({pattern})\W*$", re.I) for name, pattern in SECTION_PATTERNS.items()}
+_TOKEN_RE = re.compile(r"[a-z][a-z0-9+#]*(?:[.\-][a-z0-9+#]+)*")
+_SENTENCE_RE = re.compile(r"[.!?]+(?:\s|$)|\n\s*[-•*▪●]\s*|\n{2,}")
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+")
+_PHONE_RE = re.compile(r"\+?\d[\d\s().-]{7,}\d")
+_TABLE_LINE_RE = re.compile(r"\S(\s{3,}|\t+|\s*\|\s*)\S.*(\s{3,}|\t+|\s*\|\s*)\S")
+
+WORDS_PER_PAGE = 500
+# The part of match_job's report that goes into an analysis' job_match section.
+JOB_MATCH_FIELDS = ("match_percentage", "matching_keywords", "missing_keywords")
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+def content_terms(text):
+    """Counter of meaningful terms: tokens that are not stopwords or pure noise."""
+    return Counter(t for t in tokenize(text) if t not in STOPWORDS and len(t) > 1)
+
+
+def detect_sections(text):
+    """Map of section name -> line index of its heading; contact is detected from email/phone."""
+    found = {}
+    for index, line in enumerate((text or "").splitlines()):
+        line = line.strip()
+        if not line or len(line.split()) > 5:
+            continue
+        for name, heading_re in _HEADING_RES.items():
+            if name not in found and heading_re.match(line):
+                found[name] = index
+    if _EMAIL_RE.search(text or "") or _PHONE_RE.search(text or ""):
+        found.setdefault("contact", 0)
+    return found
+
+
+def count_syllables(word):
+    word = word.lower().strip(".-")
+    if len(word) <= 3:
+        return 1
+    word = re.sub(r"(?:[^laeiouy]es|ed|[^laeiouy]e)$", "", word)
+    word = re.sub(r"^y", "", word)
+    return max(1, len(re.findall(r"[aeiouy]{1,2}", word)))
+
+
+def readability(text):
+    """Flesch reading ease and Flesch-Kincaid grade; bullets count as sentences."""
+    words = re.findall(r"[A-Za-z]+", text or "")
+    if not words:
+        return {"flesch_reading_ease": 0.0, "flesch_kincaid_grade": 0.0, "words": 0, "sentences": 0}
+    sentences = max(1, len([s for s in _SENTENCE_RE.split(text) if s.strip()]))
+    syllables = sum(count_syllables(w) for w in words)
+    wps = len(words) / sentences
+    spw = syllables / len(words)
+    return {
+        "flesch_reading_ease": round(206.835 - 1.015 * wps - 84.6 * spw, 1),
+        "flesch_kincaid_grade": round(0.39 * wps + 11.8 * spw - 15.59, 1),
+        "words": len(words),
+        "sentences": sentences,
+    }
+
+
+def stem(term):
+    """Fold plurals so "apis" matches "api" and "services" matches "service"."""
+    if len(term) > 4 and term.endswith("ies"):
+        return term[:-3] + "y"
+    if len(term) > 3 and term.endswith("s") and not term.endswith(("ss", "us", "is")):
+        return term[:-1]
+    return term
+
+
+def stemmed_terms(text):
+    return Counter(stem(t) for t in tokenize(text) if t not in STOPWORDS and len(t) > 1)
+
+
+def split_sections(text):
+    """(name, text) for each detected section; lines before the first heading are "header"."""
+    lines = (text or "").splitlines()
+    starts = sorted((index, name) for name, index in detect_sections(text).items() if name != "contact")
+    if not starts or starts[0][0] > 0:
+        starts.insert(0, (0, "header"))
+    bounds = [index for index, _ in starts[1:]] + [len(lines)]
+    return [(name, "\n".join(lines[start:end])) for (start, name), end in zip(starts, bounds)]
+
+
+def split_requirements(job_desc, role=None):
+    """The role, then each sentence or bullet of the job description with at least two terms.
+
+    A description too terse to split that way is kept whole.
+    """
+    parts = [p.strip(" \t-•*▪●") for line in (job_desc or "").splitlines() for p in _SENTENCE_RE.split(line)]
+    requirements = [p for p in parts if len(stemmed_terms(p)) >= 2]
+    if not requirements and stemmed_terms(job_desc or ""):
+        requirements = [job_desc.strip()]
+    return ([role.strip()] if role and stemmed_terms(role) else []) + requirements
+
+
+def term_matrix(documents, vocabulary):
+    """Term-count matrix for Counters, adding new terms to ``vocabulary`` (term -> column)."""
+    rows, cols, counts = [], [], []
+    for row, terms in enumerate(documents):
+        for term, count in terms.items():
+            rows.append(row)
+            cols.append(vocabulary.setdefault(term, len(vocabulary)))
+            counts.append(count)
+    return rows, cols, counts
+
+
+def _spelling(text):
+    """Stem -> the text's first spelling of it, to display keywords as written."""
+    spelling = {}
+    for token in tokenize(text):
+        if token not in STOPWORDS and len(token) > 1:
+            spelling.setdefault(stem(token), token)
+    return spelling
+
+
+@dataclass(frozen=True)
+class JobProfile:
+    """What matching needs from a job description; shared, so never mutated."""
+    terms: Counter
+    requirements: tuple
+    requirement_terms: tuple
+    spelling: dict
+    keywords: tuple
+
+
+def job_profile(job_desc):
+    """Terms, requirements and keyword spellings of a job description, kept in the JD store.
+
+    Taken from the same cleaned text the prompt gets, so "About us" and benefits
+    sections do not count as requirements.
+    """
+    def build():
+        text = clean_job_description(job_desc) or job_desc
+        requirements = split_requirements(text)
+        terms = stemmed_terms(text)
+        spelling = _spelling(text)
+        return JobProfile(terms, tuple(requirements), tuple(stemmed_terms(r) for r in requirements), spelling,
+                          tuple(spelling[term] for term, _ in terms.most_common(40)))
+    return get_jd_store().derive(job_desc, "profile", build)
+
+
+def match_job(resume_text, job_desc, role=None, limit=40):
+    """Match a resume against a job description with TF-IDF vectors, in a few milliseconds.
+
+    Resume sections and job-description requirements (sentences and bullets) are the
+    documents of one small TF-IDF space. From it come:
+
+    - ``keyword_coverage``: share of the description's ``limit`` most frequent terms,
+      weighted by frequency, that the resume contains;
+    - ``requirement_coverage``: per requirement, the IDF-weighted share of its terms the
+      resume contains, averaged;
+    - ``sections``: cosine similarity of each resume section to the whole description;
+    - ``requirements``: each requirement's coverage and its most similar section.
+
+    ``match_percentage`` is the mean of the two coverages. Deterministic for equal
+    inputs. Returns None when the description has no usable terms.
+    """
+    return match_jobs(resume_text, [job_desc], role, limit)[0]
+
+
+def match_jobs(resume_text, job_descs, role=None, limit=40):
+    """``match_job`` for many job descriptions, with the resume tokenized once.
+
+    Every description keeps its own TF-IDF space (its requirements plus the resume
+    sections), so its report equals ``match_job``'s and does not depend on the others.
+    Descriptions are split and tokenized once per posting (``job_profile``).
+    All spaces are computed together: a description x term IDF matrix scales one shared
+    term-count matrix, and per-description sums are grouped by row owner.
+    """
+    sections = split_sections(resume_text)
+    section_terms = [stemmed_terms(text) for _, text in sections]
+    resume_terms = Counter()
+    for terms in section_terms:
+        resume_terms.update(terms)
+
+    role_terms = stemmed_terms(role)
+    role_requirements = [(role.strip(), role_terms)] if role_terms else []
+    role_spelling = _spelling(role)
+    targets, requirements, owners, requirement_terms = [], [], [], []
+    for job_desc in job_descs:
+        profile = job_profile(job_desc) if job_desc else None
+        target_terms = Counter(profile.terms) if profile else Counter()
+        target_terms.update(role_terms)
+        texts = role_requirements + (list(zip(profile.requirements, profile.requirement_terms)) if profile else [])
+        if not target_terms or not texts:
+            targets.append(None)
+            continue
+        spelling = dict(profile.spelling) if profile else {}
+        for term, spelled in role_spelling.items():
+            spelling.setdefault(term, spelled)
+        targets.append((target_terms, spelling, len(requirements)))
+        for text, terms in texts:
+            requirements.append(text)
+            owners.append(len(targets) - 1)
+            requirement_terms.append(terms)
+    if not requirements:
+        return [None] * len(job_descs)
+
+    vocabulary = {}
+    section_rows, section_cols, section_counts = term_matrix(section_terms, vocabulary)
+    rows, cols, counts = term_matrix(requirement_terms, vocabulary)
+    section_tf = np.zeros((len(sections), len(vocabulary)))
+    section_tf[section_rows, section_cols] = section_counts
+    requirement_tf = np.zeros((len(requirements), len(vocabulary)))
+    requirement_tf[rows, cols] = counts
+    owners = np.array(owners)
+
+    # Document frequency and IDF per description: its own requirements plus the sections.
+    jobs = len(job_descs)
+    per_job = np.bincount(owners, minlength=jobs)
+    df = np.zeros((jobs, len(vocabulary)))
+    np.add.at(df, owners, requirement_tf > 0)
+    df += np.count_nonzero(section_tf, axis=0)
+    idf = np.log((1 + len(sections) + per_job[:, None]) / (1 + df)) + 1
+
+    section_sub = np.where(section_tf > 0, 1 + np.log(np.maximum(section_tf, 1)), 0)
+    requirement_idf = idf[owners]
+    requirement_rows = np.where(requirement_tf > 0, 1 + np.log(np.maximum(requirement_tf, 1)), 0) * requirement_idf
+    requirement_rows /= np.maximum(np.linalg.norm(requirement_rows, axis=1, keepdims=True), 1e-12)
+    # Norms of every section row under every description's IDF, without materializing them.
+    section_norms = np.sqrt((idf ** 2) @ (section_sub ** 2).T)  # jobs x sections
+    section_norms[section_norms == 0] = 1
+    similarity = ((requirement_rows * requirement_idf) @ section_sub.T) / section_norms[owners]
+
+    present = np.zeros(len(vocabulary))
+    present[[vocabulary[t] for t in resume_terms if t in vocabulary]] = 1
+    weighted = (requirement_tf > 0) * requirement_idf
+    totals = weighted.sum(axis=1)
+    coverage = np.divide(weighted @ present, totals, out=np.zeros(len(requirements)), where=totals > 0)
+    requirement_coverage = np.bincount(owners, weights=coverage, minlength=jobs) / np.maximum(per_job, 1)
+
+    descriptions = np.zeros((jobs, len(vocabulary)))
+    np.add.at(descriptions, owners, requirement_rows)
+    descriptions /= np.maximum(np.linalg.norm(descriptions, axis=1, keepdims=True), 1e-12)
+    section_scores = ((descriptions * idf) @ section_sub.T) / section_norms  # jobs x sections
+    best = similarity.argmax(axis=1)
+
+    reports = []
+    for index, target in enumerate(targets):
+        if target is None:
+            reports.append(None)
+            continue
+        target_terms, spelling, first = target
+        keywords = target_terms.most_common(limit)
+        matched = [(term, count) for term, count in keywords if term in resume_terms]
+        keyword_coverage = sum(count for _, count in matched) / sum(count for _, count in keywords)
+        own = range(first, first + per_job[index])
+        reports.append({
+            "match_percentage": _clamp(50 * (keyword_coverage + requirement_coverage[index])),
+            "matching_keywords": [spelling[term] for term, _ in matched],
+            "missing_keywords": [spelling[term] for term, _ in keywords if term not in resume_terms],
+            "keyword_coverage": _clamp(100 * keyword_coverage),
+            "requirement_coverage": _clamp(100 * requirement_coverage[index]),
+            "sections": {name: _clamp(100 * score) for (name, _), score in zip(sections, section_scores[index])},
+            "requirements": [
+                {
+                    "text": requirements[r],
+                    "coverage": _clamp(100 * coverage[r]),
+                    "best_section": sections[best[r]][0],
+                    "similarity": _clamp(100 * similarity[r, best[r]]),
+                }
+                for r in own
+            ],
+        })
+    return reports
+
+
+def _clamp(value):
+    return int(max(0, min(100, round(value))))
+
+
+def length_score(words, pages):
+    """100 inside the usual one-to-two page range, falling off linearly outside it."""
+    if words < 350:
+        score = 100 * words / 350
+    elif words > 1000:
+        score = 100 - (words - 1000) / 15
+    else:
+        score = 100
+    if pages and pages > 2:
+        score -= 15 * (pages - 2)
+    return _clamp(score)
+
+
+def ats_status(score):
+    if score >= 75:
+        return "Pass"
+    if score >= 60:
+        return "Moderate"
+    if score >= 45:
+        return "Needs Improvement"
+    return "Fail"
+
+
+def score_resume(text, job_desc=None, role=None, file_type="PDF", pages=None):
+    """Compute the deterministic parts of an analysis in a few milliseconds.
+
+    Returns ``ats_score``, ``ats_status``, ``ats_breakdown``, ``formatting`` and
+    ``bonus_metrics`` in the same shape the model produces, plus ``job_match`` from
+    ``match_job`` when a job description is given.
+    """
+    sections = detect_sections(text)
+    read = readability(text)
+    words = read["words"]
+    est_pages = pages or max(1, round(words / WORDS_PER_PAGE))
+
+    lines = [line for line in (text or "").splitlines() if line.strip()]
+    table_lines = sum(1 for line in lines if _TABLE_LINE_RE.search(line))
+    tables_detected = table_lines >= 3
+    headings_ok = sum(1 for name in CORE_SECTIONS if name in sections) >= 3
+
+    issues = []
+    if not headings_ok:
+        issues.append("Standard section headings (Experience, Education, Skills) were not detected")
+    if tables_detected:
+        issues.append("Table-like multi-column layout detected; ATS parsers may scramble it")
+    if "contact" not in sections:
+        issues.append("No email address or phone number found")
+    graphics_issues = "None detected"
+    if pages and words < 80 * pages:
+        graphics_issues = "Very little text per page; content may be in images or graphics"
+        issues.append(graphics_issues)
+    if est_pages > 2:
+        issues.append(f"Resume is {est_pages} pages; 1-2 pages is recommended")
+
+    section_completeness = _clamp(100 * sum(1 for name in CORE_SECTIONS if name in sections) / len(CORE_SECTIONS))
+    readability_score = _clamp(read["flesch_reading_ease"] + 20)
+    formatting_score = _clamp(100 - 15 * len(issues))
+    len_score = length_score(words, pages)
+
+    match = match_job(text, job_desc, role) if job_desc or role else None
+    if match:
+        keywords_score = match["match_percentage"]
+    else:
+        # Without a target, reward a visible skills section and vocabulary breadth.
+        keywords_score = _clamp(min(len(content_terms(text)), 150) / 150 * 70 + (30 if "skills" in sections else 0))
+
+    breakdown = {
+        "keywords": keywords_score,
+        "formatting": formatting_score,
+        "sections": section_completeness,
+        "readability": readability_score,
+    }
+    ats_score = _clamp(
+        0.35 * breakdown["keywords"] + 0.2 * breakdown["formatting"]
+        + 0.25 * breakdown["sections"] + 0.2 * breakdown["readability"]
+    )
+
+    result = {
+        "ats_score": ats_score,
+        "ats_status": ats_status(ats_score),
+        "ats_breakdown": breakdown,
+        "formatting": {
+            "file_type": file_type,
+            "tables_detected": tables_detected,
+            "headings_ok": headings_ok,
+            "graphics_issues": graphics_issues,
+            "length_pages": est_pages,
+            "issues": issues,
+            "compliant": not issues,
+        },
+        "bonus_metrics": {
+            "readability_score": readability_score,
+            "length_score": len_score,
+            "grammar_score": None,
+            "section_completeness": section_completeness,
+        },
+    }
+    if match and job_desc:
+        result["job_match"] = {key: match[key] for key in JOB_MATCH_FIELDS}
+        result["job_match"]["skill_gap_analysis"] = ""
+    return result
+
+
+def merge_local_scores(data, local):
+    """Overlay local scores on a model result; model-only fields such as grammar_score are kept."""
+    merged = dict(data)
+    for key in ("ats_score", "ats_status", "ats_breakdown", "formatting"):
+        merged[key] = local[key]
+    if local.get("job_match"):
+        job_match = dict(local["job_match"])
+        if isinstance(data.get("job_match"), dict) and data["job_match"].get("skill_gap_analysis"):
+            job_match["skill_gap_analysis"] = data["job_match"]["skill_gap_analysis"]
+        merged["job_match"] = job_match
+    bonus = dict(local["bonus_metrics"])
+    if isinstance(data.get("bonus_metrics"), dict) and data["bonus_metrics"].get("grammar_score") is not None:
+        bonus["grammar_score"] = data["bonus_metrics"]["grammar_score"]
+    merged["bonus_metrics"] = bonus
+    return merged
@@ -0,0 +1,101 @@
+"""Static files served from memory with precompressed variants and HTTP caching.
+
+The Flask HTML pages have no template variables, so each file is read once at
+startup. It is compressed with gzip (and brotli, when the ``brotli`` package is
+installed) and given a strong ETag per encoding. A request then costs a dict
+lookup: it gets the best encoding it accepts, or ``304 Not Modified`` when its
+``If-None-Match`` still matches. Files changed on disk are picked up on restart.
+"""
+import gzip
+import hashlib
+import os
+import time
+
+from werkzeug.http import http_date
+from werkzeug.wrappers import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Preferred first when the client rates them equally.
+ENCODINGS = ("br", "gzip", "identity")
+# Below this size compression saves too little to bother.
+MIN_COMPRESS_BYTES = 512
+
+
+def _compress(body, encoding):
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=9, mtime=0)
+    if encoding == "br" and brotli is not None:
+        return brotli.compress(body, quality=11)
+    return None
+
+
+class StaticFile:
+    """One file's body in every worthwhile encoding, each with its own strong ETag."""
+
+    def __init__(self, path, content_type):
+        with open(path, "rb") as f:
+            body = f.read()
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        self.content_type = content_type
+        self.last_modified = http_date(os.path.getmtime(path))
+        self.variants = {"identity": (body, f'"{digest}"')}
+        if len(body) >= MIN_COMPRESS_BYTES:
+            for encoding in ("br", "gzip"):
+                compressed = _compress(body, encoding)
+                if compressed is not None and len(compressed) < len(body):
+                    self.variants[encoding] = (compressed, f'"{digest}-{encoding}"')
+
+    def choose(self, accept_encodings):
+        """Best encoding the client accepts; identity unless it is explicitly refused."""
+        best, best_quality = None, 0
+        for encoding in ENCODINGS:
+            if encoding not in self.variants:
+                continue
+            quality = accept_encodings[encoding]
+            if encoding == "identity" and "identity" not in accept_encodings and "*" not in accept_encodings:
+                quality = 1
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best or "identity"
+
+
+class StaticFiles:
+    """Files under ``root`` loaded into memory, keyed by name."""
+
+    def __init__(self, root, max_age=3600):
+        self.root = root
+        self.max_age = max_age
+        self.files = {}
+        self.loaded_at = time.time()
+
+    def add(self, name, content_type="text/html; charset=utf-8"):
+        self.files[name] = StaticFile(os.path.join(self.root, name), content_type)
+
+    def response(self, name, request):
+        """Response for ``request``: 200 with the negotiated encoding, or 304."""
+        static = self.files[name]
+        encoding = static.choose(request.accept_encodings)
+        body, etag = static.variants[encoding]
+        headers = {
+            "ETag": etag,
+            "Last-Modified": static.last_modified,
+            "Cache-Control": f"public, max-age={self.max_age}",
+            "Vary": "Accept-Encoding",
+        }
+        # Any encoding's tag revalidates: the client holds a copy of the same content.
+        for _, tag in static.variants.values():
+            if request.if_none_match.contains_weak(tag.strip('"')):
+                return Response(status=304, headers=dict(headers, ETag=tag))
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(body, content_type=static.content_type, headers=headers)
+
+    def stats(self):
+        return {
+            name: {encoding: len(body) for encoding, (body, _) in static.variants.items()}
+            for name, static in self.files.items()
+        }
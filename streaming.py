@@ -0,0 +1,69 @@
+"""Incremental parsing of streamed model output into top-level JSON sections."""
+import json
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Events message with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class SectionStreamer:
+    """Yields ``(key, value)`` for each top-level member of a JSON object as soon as it closes.
+
+    Text before the opening brace (prose, code fences) is ignored. Members that do not
+    parse on their own are skipped; the caller re-parses the full text at the end.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.done = False
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start = None
+
+    def feed(self, chunk):
+        sections = []
+        if self.done or not chunk:
+            return sections
+        self.text += chunk
+        text = self.text
+        while self._pos < len(text) and not self.done:
+            ch = text[self._pos]
+            if self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+                    self._member_start = self._pos + 1
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                if self._depth == 1:
+                    self._emit(text[self._member_start:self._pos], sections)
+                    self.done = True
+                self._depth -= 1
+            elif ch == "," and self._depth == 1:
+                self._emit(text[self._member_start:self._pos], sections)
+                self._member_start = self._pos + 1
+            self._pos += 1
+        return sections
+
+    @staticmethod
+    def _emit(member, sections):
+        member = member.strip()
+        if not member:
+            return
+        try:
+            parsed = json.loads("{" + member + "}")
+        except ValueError:
+            return
+        sections.extend(parsed.items())
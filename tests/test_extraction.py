@@ -0,0 +1,63 @@
+import io
+import multiprocessing
+import os
+import signal
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import PyPDF2
+import pytest
+
+import extraction
+from extraction import ExtractionService
+
+
+def blank_pdf(pages=2):
+    writer = PyPDF2.PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=200, height=200)
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def _crash(source):
+    os._exit(1)
+
+
+@pytest.fixture
+def service():
+    service = ExtractionService(workers=2, pages_per_task=1, timeout=20)
+    yield service
+    service.shutdown()
+
+
+def test_extracts_after_a_worker_is_killed(service):
+    service.warm()
+    pool = service._pool
+    os.kill(next(iter(pool._processes)), signal.SIGKILL)
+    # The executor notices the dead worker from its management thread.
+    deadline = time.monotonic() + 10
+    while not pool._broken and time.monotonic() < deadline:
+        time.sleep(0.01)
+    with pytest.raises(BrokenProcessPool):
+        pool.submit(extraction._noop)
+
+    result = service.extract_pdf(blank_pdf())
+    assert not result.truncated
+    assert result.pages_total == 2
+    assert service._pool is not pool
+
+    assert service.extract_pdf(blank_pdf(1)).pages_total == 1
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork",
+                    reason="workers only see the patched function when forked")
+def test_document_that_keeps_breaking_the_pool_is_truncated(service, monkeypatch):
+    monkeypatch.setattr(extraction, "_count_pages", _crash)
+    result = service.extract_pdf(blank_pdf())
+    assert result.truncated
+    assert result.pages_extracted == 0
+
+    monkeypatch.undo()
+    assert service.extract_pdf(blank_pdf()).pages_total == 2
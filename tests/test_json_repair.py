@@ -0,0 +1,84 @@
+import json
+import os
+
+import pytest
+
+from json_repair import JSONRepairer, complete, parse_json, repair_json
+
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "json_repair_corpus.jsonl")) as f:
+    CORPUS = [json.loads(line) for line in f if line.strip()]
+
+ANSWER = json.dumps({
+    "resume_summary": "Backend engineer, six years of Python and Go; payment APIs.",
+    "skills": {"technical": ["python", "go", "postgresql"], "soft": ["mentoring"]},
+    "experience": [{"title": "Senior Engineer", "years": 3.5, "remote": True, "manager": None}],
+    "job_match": {"skill_gap_analysis": "Strong \"backend\" fit;\nno Terraform shown."},
+}, indent=2)
+
+CHUNK_SIZES = (1, 2, 3, 7, 16, 64)
+
+
+def feed(text, size):
+    repairer = JSONRepairer()
+    for start in range(0, len(text), size):
+        repairer.feed(text[start:start + size])
+    return repairer
+
+
+@pytest.mark.parametrize("case", CORPUS, ids=[case["name"] for case in CORPUS])
+def test_corpus(case):
+    assert parse_json(case["input"])[0] == case["expect"]
+
+
+@pytest.mark.parametrize("size", CHUNK_SIZES)
+@pytest.mark.parametrize("case", CORPUS, ids=[case["name"] for case in CORPUS])
+def test_chunked_feed_matches_whole_text(case, size):
+    assert feed(case["input"], size).finish() == repair_json(case["input"])
+
+
+@pytest.mark.parametrize("size", CHUNK_SIZES)
+def test_truncated_answers_match_whole_text(size):
+    for cut in range(1, len(ANSWER)):
+        text = ANSWER[:cut]
+        assert feed(text, size).finish() == repair_json(text), cut
+
+
+@pytest.mark.parametrize("wrapper", ["{}", "Sure:\n```json\n{}\n```\nDone.", "```\n{}\n``` and {\"x\": 1}"])
+def test_fences_split_across_chunks(wrapper):
+    text = wrapper.replace("{}", ANSWER, 1)
+    for size in CHUNK_SIZES:
+        data, _ = feed(text, size).parse()
+        assert data == json.loads(ANSWER)
+
+
+def test_snapshot_is_always_valid_json():
+    repairer = JSONRepairer()
+    assert repairer.snapshot() is None
+    seen = []
+    for ch in ANSWER:
+        repairer.feed(ch)
+        snapshot = repairer.snapshot()
+        if snapshot is not None:
+            seen.append(json.loads(snapshot))
+    assert seen[-1] == json.loads(ANSWER)
+
+
+def test_truncated_answer_keeps_the_half_written_string():
+    cut = ANSWER.index("six years") + 3
+    data, repairs = parse_json(ANSWER[:cut])
+    assert data == {"resume_summary": "Backend engineer, six"}
+    assert "truncated" in repairs
+
+
+def test_finish_is_idempotent_and_later_feeds_are_ignored():
+    repairer = feed(ANSWER[:40], 5)
+    first = repairer.finish()
+    repairer.feed('"more": 1}')
+    assert repairer.finish() == first
+
+
+def test_complete_fills_missing_fields_and_numbers():
+    template = {"score": 0, "tags": [""], "nested": {"note": ""}, "maybe": ""}
+    data, missing = complete({"score": "72%", "tags": "python"}, template, optional=("maybe",))
+    assert data == {"score": 72, "tags": ["python"], "nested": {"note": ""}, "maybe": None}
+    assert missing == ["nested"]
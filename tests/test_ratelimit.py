@@ -0,0 +1,81 @@
+import pytest
+
+from conftest import FakeClock
+from ratelimit import AdmissionController, ClientLimiter, RateLimited, parse_duration
+
+
+def controller(clock, **kwargs):
+    # The clock's sleep stands in for the condition wait, so queued calls take no real time.
+    return AdmissionController(clock=clock, wait=clock.sleep, **kwargs)
+
+
+def test_parse_duration():
+    assert parse_duration("2m59.56s") == pytest.approx(179.56)
+    assert parse_duration("120ms") == pytest.approx(0.12)
+    assert parse_duration("30") == 30
+    assert parse_duration("soon") is None
+    assert parse_duration(None) is None
+
+
+def test_admits_up_to_the_request_budget_then_waits_for_refill():
+    clock = FakeClock()
+    admission = controller(clock, rpm=60, max_wait=5)
+    for _ in range(60):
+        admission.acquire(10)
+    assert clock.slept == []
+    admission.acquire(10)
+    assert clock.slept == [pytest.approx(1.0)]
+    assert admission.stats()["admitted"] == 61
+    assert admission.stats()["waited_seconds"] == 1.0
+
+
+def test_sheds_calls_that_would_wait_past_max_wait():
+    clock = FakeClock()
+    admission = controller(clock, tpm=6000, max_wait=5)
+    admission.acquire(6000)
+    with pytest.raises(RateLimited) as raised:
+        admission.acquire(1000)
+    assert raised.value.retry_after == 10
+    assert clock.slept == []
+    assert admission.shed == 1
+    clock.advance(10)
+    admission.acquire(1000)
+    assert admission.admitted == 2
+
+
+def test_settle_refunds_overestimated_tokens():
+    clock = FakeClock()
+    admission = controller(clock, tpm=1000, max_wait=0)
+    admission.acquire(1000)
+    admission.settle(1000, 400)
+    admission.acquire(600)
+    with pytest.raises(RateLimited):
+        admission.acquire(1)
+
+
+def test_headers_block_until_reset():
+    clock = FakeClock()
+    admission = controller(clock, max_wait=10)
+    admission.observe({"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "2.5s"})
+    admission.acquire(100)
+    assert clock.slept == [pytest.approx(2.5)]
+
+
+def test_penalize_after_429():
+    clock = FakeClock()
+    admission = controller(clock, max_wait=3)
+    admission.penalize(7)
+    with pytest.raises(RateLimited) as raised:
+        admission.acquire(100)
+    assert raised.value.retry_after == 7
+    assert admission.stats()["blocked_for"] == 7
+
+
+def test_client_limiter_allows_a_burst_per_client():
+    limiter = ClientLimiter(per_minute=60, burst=2)
+    limiter.check("a")
+    limiter.check("a")
+    with pytest.raises(RateLimited):
+        limiter.check("a")
+    limiter.check("b")
+    assert limiter.stats()["rejected"] == 1
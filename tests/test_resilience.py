@@ -0,0 +1,184 @@
+import random
+
+import httpx
+import openai
+import pytest
+
+from conftest import FakeClock
+from resilience import (
+    CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen, DeadlineExceeded, RetryBudget, RetryPolicy,
+    call_with_retries,
+)
+
+REQUEST = httpx.Request("POST", "https://llm.test/v1/chat/completions")
+
+
+def server_error():
+    return openai.InternalServerError("boom", response=httpx.Response(500, request=REQUEST), body=None)
+
+
+def bad_request():
+    return openai.BadRequestError("bad", response=httpx.Response(400, request=REQUEST), body=None)
+
+
+class FakeUpstream:
+    """Fails with ``errors`` in order, then answers "ok"; records each attempt's timeout."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.timeouts = []
+
+    def __call__(self, timeout):
+        self.timeouts.append(timeout)
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+class MaxJitter:
+    def uniform(self, low, high):
+        return high
+
+
+def test_breaker_opens_after_consecutive_failures():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=clock)
+    breaker.record(False)
+    breaker.record(False)
+    assert breaker.state == CLOSED
+    breaker.record(False)
+    assert breaker.state == OPEN
+    assert breaker.opened == 1
+    with pytest.raises(CircuitOpen) as raised:
+        breaker.check()
+    assert raised.value.retry_after == 30
+
+
+def test_breaker_opens_on_error_rate():
+    breaker = CircuitBreaker(failure_threshold=10, max_error_rate=0.5, window=10, clock=FakeClock())
+    for ok in (True, False, True, False, False):
+        breaker.record(ok)
+    assert breaker.state == OPEN
+
+
+def test_breaker_half_open_lets_one_probe_through():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.record(False)
+    clock.advance(29.9)
+    assert not breaker.allow()
+    clock.advance(0.1)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record(True)
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_breaker_failed_probe_reopens():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.record(False)
+    clock.advance(30)
+    assert breaker.allow()
+    breaker.record(False)
+    assert breaker.state == OPEN
+    assert breaker.opened == 2
+    assert breaker.retry_after() == 30
+
+
+def test_breaker_release_frees_the_probe():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.record(False)
+    clock.advance(30)
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+def test_retries_transient_errors_with_jittered_backoff():
+    clock = FakeClock()
+    upstream = FakeUpstream(server_error(), server_error())
+    policy = RetryPolicy(max_attempts=3, base_delay=0.5, max_delay=8, attempt_timeout=30, total_timeout=60)
+    assert call_with_retries(upstream, policy, sleep=clock.sleep, clock=clock, rng=MaxJitter()) == "ok"
+    assert clock.slept == [0.5, 1.0]
+    assert upstream.timeouts == [30, 30, 30]
+
+
+def test_jitter_stays_within_the_capped_step():
+    policy = RetryPolicy(base_delay=0.5, max_delay=2.0)
+    rng = random.Random(7)
+    for attempt in range(6):
+        assert 0 <= policy.delay(attempt, rng) <= min(2.0, 0.5 * 2 ** attempt)
+
+
+def test_non_retryable_errors_are_not_retried():
+    clock = FakeClock()
+    upstream = FakeUpstream(bad_request())
+    with pytest.raises(openai.BadRequestError):
+        call_with_retries(upstream, RetryPolicy(), sleep=clock.sleep, clock=clock)
+    assert len(upstream.timeouts) == 1
+    assert clock.slept == []
+
+
+def test_last_attempt_gets_what_is_left_of_the_deadline():
+    clock = FakeClock()
+    policy = RetryPolicy(max_attempts=3, base_delay=4, max_delay=4, attempt_timeout=30, total_timeout=10)
+    upstream = FakeUpstream(server_error())
+    call_with_retries(upstream, policy, sleep=clock.sleep, clock=clock, rng=MaxJitter())
+    assert upstream.timeouts == [10, 6]
+
+
+def test_backoff_past_the_deadline_raises_the_last_error():
+    clock = FakeClock()
+    policy = RetryPolicy(max_attempts=3, base_delay=8, max_delay=8, total_timeout=5)
+    upstream = FakeUpstream(server_error())
+    with pytest.raises(openai.InternalServerError):
+        call_with_retries(upstream, policy, sleep=clock.sleep, clock=clock, rng=MaxJitter())
+    assert clock.slept == []
+
+
+def test_late_wakeup_past_the_deadline():
+    clock = FakeClock()
+    policy = RetryPolicy(max_attempts=3, base_delay=1, max_delay=1, attempt_timeout=3, total_timeout=5)
+
+    def slow(timeout):
+        clock.advance(timeout)
+        raise server_error()
+
+    def oversleep(seconds):
+        clock.advance(seconds + 2)
+
+    with pytest.raises(DeadlineExceeded):
+        call_with_retries(slow, policy, sleep=oversleep, clock=clock, rng=MaxJitter())
+
+
+def test_retry_budget_exhaustion_stops_retries():
+    clock = FakeClock()
+    budget = RetryBudget(ratio=0.0, min_retries=2, window=10, clock=clock)
+    policy = RetryPolicy(max_attempts=3, base_delay=0.1)
+    assert call_with_retries(FakeUpstream(server_error(), server_error()), policy, budget,
+                             sleep=clock.sleep, clock=clock) == "ok"
+    upstream = FakeUpstream(server_error())
+    with pytest.raises(openai.InternalServerError):
+        call_with_retries(upstream, policy, budget, sleep=clock.sleep, clock=clock)
+    assert len(upstream.timeouts) == 1
+    assert budget.exhausted == 1
+    assert budget.stats() == {"ratio": 0.0, "calls": 2, "retries": 2, "exhausted": 1}
+
+
+def test_retry_budget_scales_with_calls_and_refills_after_the_window():
+    clock = FakeClock()
+    budget = RetryBudget(ratio=0.5, min_retries=0, window=10, clock=clock)
+    for _ in range(4):
+        budget.record_call()
+    assert budget.try_spend()
+    assert budget.try_spend()
+    assert not budget.try_spend()
+    clock.advance(10)
+    budget.record_call()
+    budget.record_call()
+    assert budget.try_spend()
+    assert budget.stats()["calls"] == 2